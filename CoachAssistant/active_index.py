@@ -0,0 +1,24 @@
+# 패키지 import 없이 동작해야 합니다: 서비스(`CoachAssistant.document`)와 CoachAssistant 폴더에서 직접 실행하는 `db_update.py`가 함께 사용합니다.
+import os
+import json
+import yaml
+
+with open(os.path.join(os.path.dirname(__file__), "config", 'conf.yaml')) as f:
+    config = yaml.full_load(f)
+
+
+active_path = os.path.join(os.path.dirname(__file__), config["index"]["active_file"])
+
+
+def read_active() -> dict:
+    """`db_update.run`이 교체하는 활성 인덱스 버전 정보를 읽습니다. `active.json`이 없으면 버전 없는 기존 인덱스를 사용합니다."""
+    if os.path.exists(active_path):
+        with open(active_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    return {
+        "version": None,
+        "pinecone_index": config["pinecone"]["index_name"],
+        "local_path": config["index"]["local_path"],
+        "tfidf_params": os.path.join("config", "params", "tfidf_params.pkl")
+    }
@@ -0,0 +1,91 @@
+import time
+import hashlib
+import threading
+
+import numpy as np
+
+from typing import Iterable, List
+
+from utils.metrics import CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS
+
+
+def reference_key(reference_texts:Iterable[str]) -> frozenset:
+    """답변 생성에 사용한 가이드 문서 집합을 본문 해시의 집합으로 나타냅니다."""
+    return frozenset(hashlib.sha1(text.encode("utf-8")).hexdigest() for text in reference_texts)
+
+
+class SemanticAnswerCache:
+    """
+    생성된 답변을 (쿼리 임베딩, 가이드 문서 집합)과 함께 보관하고, 의미가 비슷한 질문에 재사용합니다.
+    - 쿼리 임베딩(L2 정규화)의 코사인 유사도가 `similarity` 이상이고,
+    - 가이드 문서 집합의 Jaccard 유사도가 `reference_similarity` 이상이며,
+    - 같은 인덱스 버전에서 `ttl`초 이내에 생성된 답변만 사용합니다.
+    임베딩은 고정 크기 행렬에 보관하여 조회 시 한 번의 행렬-벡터 곱으로 비교하고, 가득 차면 오래된 항목부터 교체합니다.
+    """
+    def __init__(self, name:str, max_size:int=1024, ttl:float=86400, similarity:float=0.92, reference_similarity:float=0.8):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.reference_similarity = reference_similarity
+
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._entries = [None] * max_size   # (만료 시각, 인덱스 버전, 가이드 문서 집합, 답변)
+        self._next = 0
+
+    def get(self, version:str|None, vector:List[float], references:frozenset) -> str | None:
+        with self._lock:
+            if self._vectors is None:
+                CACHE_MISSES.labels(self.name).inc()
+                return None
+
+            scores = self._vectors @ np.asarray(vector, dtype=np.float32)
+            now = time.monotonic()
+
+            for slot in np.flatnonzero(scores >= self.similarity)[np.argsort(-scores[scores >= self.similarity])]:
+                entry = self._entries[slot]
+                if entry is None:
+                    continue
+
+                expires_at, entry_version, entry_references, answer = entry
+                if expires_at < now or entry_version != version:
+                    self._remove(slot)
+                    CACHE_EVICTIONS.labels(self.name).inc()
+                    continue
+
+                union = entry_references | references
+                if not union or len(entry_references & references) / len(union) >= self.reference_similarity:
+                    CACHE_HITS.labels(self.name).inc()
+                    return answer
+
+            CACHE_MISSES.labels(self.name).inc()
+            return None
+
+    def set(self, version:str|None, vector:List[float], references:frozenset, answer:str) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            slot = self._next
+            if self._entries[slot] is not None:
+                CACHE_EVICTIONS.labels(self.name).inc()
+
+            self._vectors[slot] = vector
+            self._entries[slot] = (time.monotonic() + self.ttl, version, references, answer)
+            self._next = (slot + 1) % self.max_size
+
+    def _remove(self, slot:int) -> None:
+        self._vectors[slot] = 0
+        self._entries[slot] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors = None
+            self._entries = [None] * self.max_size
+            self._next = 0
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self._entries)
@@ -0,0 +1,126 @@
+"""
+쿼리 임베딩 마이크로 벤치마크
+
+짧은(<32 토큰)/중간(32~128 토큰)/긴(128~512 토큰) 쿼리에 대해 기존 방식(최대 길이 패딩 + 확장 mask pooling)과
+`document.batch_sentence_embedding`(길이별 묶음 + bmm pooling + 버퍼 재사용)의 쿼리당 지연 시간과 메모리 할당량을 비교합니다.
+
+사용법 (저장소 루트에서):
+    python -m CoachAssistant.bench_encoder --repeat 20 --batch-size 8
+"""
+import os
+import time
+import argparse
+import statistics
+import tracemalloc
+
+import torch
+
+from transformers import AutoTokenizer
+
+from CoachAssistant import document
+from CoachAssistant.encoder import load_encoder
+
+SENTENCES = [
+    "식후 혈당이 많이 올라가요.",
+    "공복혈당을 낮추려면 아침에 어떤 음식을 먹는 게 좋을까요?",
+    "16시간 간헐적 단식을 하고 있는데 저녁 식사 후 바로 자면 다음 날 공복혈당에 영향이 있을까요?",
+    "운동은 식후 30분 정도 걷기를 하고 있고, 주말에는 등산도 다니고 있습니다.",
+    "탄수화물을 아예 안 먹다시피 하면 하루 종일 음식 생각밖에 안 나더라구요.",
+]
+
+BUCKETS = {
+    "short": (1, 32),
+    "medium": (32, 128),
+    "long": (128, 512),
+}
+
+
+def make_queries(tok, low:int, high:int, n:int) -> list:
+    """토큰 수가 [low, high) 범위에 들도록 예문을 이어 붙여 쿼리를 만듭니다."""
+    queries = []
+    i = 0
+    while len(queries) < n:
+        query = SENTENCES[i % len(SENTENCES)]
+        j = i + 1
+        while len(tok(query)["input_ids"]) < low:
+            query += " " + SENTENCES[j % len(SENTENCES)]
+            j += 1
+        if len(tok(query)["input_ids"]) < high:
+            queries.append(query)
+        else:
+            queries.append(tok.decode(tok(query)["input_ids"][1:high - 2]))
+        i += 1
+    return queries
+
+
+def naive_embedding(queries:list) -> list:
+    """변경 전 방식: 배치 전체를 가장 긴 쿼리에 맞춰 패딩하고, 확장된 mask로 mean pooling"""
+    inputs = document.tok(queries, return_tensors="pt", padding=True, truncation=True, max_length=512)
+
+    with torch.no_grad():
+        embeddings = document.model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).last_hidden_state
+
+    mask = inputs["attention_mask"].unsqueeze(-1).expand(embeddings.size()).float()
+    pooled = torch.sum(embeddings * mask, 1) / torch.clamp(mask.sum(1), min=1e-9)
+    return torch.nn.functional.normalize(pooled, dim=1).tolist()
+
+
+def measure(func, batches:list, repeat:int) -> dict:
+    for batch in batches:
+        func(batch)  # 워밍업
+
+    latencies = []
+    for _ in range(repeat):
+        for batch in batches:
+            start = time.perf_counter()
+            func(batch)
+            latencies.append((time.perf_counter() - start) * 1000 / len(batch))
+
+    with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], profile_memory=True) as prof:
+        tracemalloc.start()
+        for batch in batches:
+            func(batch)
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    events = [e for e in prof.key_averages() if e.self_cpu_memory_usage > 0]
+    n_queries = sum(len(batch) for batch in batches)
+
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 20 else max(latencies),
+        "tensor_allocs": sum(e.count for e in events) / n_queries,
+        "tensor_mb": sum(e.self_cpu_memory_usage for e in events) / n_queries / 2**20,
+        "python_peak_kb": python_peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="쿼리 임베딩 지연 시간/메모리 할당 벤치마크")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=8, help="mixed 배치(짧은/중간/긴 쿼리 혼합)의 크기")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op 스레드 수 (0: 기본값)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    config = document.config["embedding_model"]
+    document.tok = AutoTokenizer.from_pretrained(config["model_path"], clean_up_tokenization_spaces=True)
+    document.model = load_encoder(config, document.tok, os.path.dirname(document.__file__))
+
+    queries = {name: make_queries(document.tok, low, high, args.batch_size) for name, (low, high) in BUCKETS.items()}
+    cases = {name: [[q] for q in qs] for name, qs in queries.items()}
+    mixed = [q for qs in zip(*queries.values()) for q in qs][:args.batch_size]
+    cases["mixed"] = [mixed]
+
+    print(f"backend: {config.get('backend', 'torch')}, threads: {torch.get_num_threads()}, repeat: {args.repeat}")
+    print(f"{'case':<8} {'impl':<9} {'p50 ms/q':>9} {'p95 ms/q':>9} {'allocs/q':>9} {'MB/q':>8} {'py peak KB':>11}")
+    for name, batches in cases.items():
+        for impl, func in [("naive", naive_embedding), ("bucketed", document.batch_sentence_embedding)]:
+            r = measure(func, batches, args.repeat)
+            print(f"{name:<8} {impl:<9} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['tensor_allocs']:>9.1f} {r['tensor_mb']:>8.2f} {r['python_peak_kb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,11 @@ import os
 import re
 
 from openai import OpenAI as summaryai
+from openai import AsyncOpenAI as asummaryai
 from langchain_openai import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
+
+from utils.http_client import get_async_client, get_sync_client
+from .prompts import CONVERSATION_PROMPT, SUMMARY_PROMPT, register_prompt_metrics
 
 class Chatbot_:
     def __init__(self):
@@ -15,130 +18,57 @@ class Chatbot_:
             max_tokens=1500,
             frequency_penalty=0.25, # 반복 감소, 다양성 증가. (0-1)
             presence_penalty=0,  # 새로운 단어 사용 장려. (0-1)
-            top_p=0              # 상위 P% 토큰만 고려 (0-1) 
+            top_p=0,             # 상위 P% 토큰만 고려 (0-1) 
+            http_client=get_sync_client(),
+            http_async_client=get_async_client()
         )
+        self.summary_client = asummaryai(
+            api_key=os.environ['OPENAI_API_KEY'],
+            http_client=get_async_client()
+        )
+        register_prompt_metrics()
 
-    def getConversation_prompttemplate(self, query, reference):
-        # 프롬프트 템플릿 설정
-        system_message_content = '''
-            당신은 "웰다"의 헬스케어 상담사입니다. "웰다" 가이드를 기반으로 질문에 대한 대답을 두괄식으로 먼저 제공하고, 
-            핵심 정보와 관련 참고 정보를 추가하여 간결하고 부드러운 답변을 작성하세요. 각 단락은 최대 350자를 넘지 않도록 적절히 길이를 조절해 주세요.
-
-            답변 작성 시 따라야 할 단계:
-            1. 질문이 불명확할 경우: "질문을 이해하기 어렵습니다. 추가 정보를 포함해 다시 질문해 주실 수 있을까요?"라고 답해 주세요.
-            2. 가이드만으로 질문에 대한 답변이 가능한 경우: 관련 지침과 금지 표현을 참고하여 일관된 말투로 답변을 제공하세요. 가이드랑 매칭될 시 그대로 보내되 추가 설명을 언급해도 좋습니다.
-            3. 가이드가 비어 있거나 연관된 내용이 없을 경우:
-            - 기본적인 지식으로 답변이 가능한 경우: 사실만을 포함하여 답변하세요. 관련 지침과 금지 표현을 준수하고 일관된 말투로 작성하세요.
-            - 기본적인 지식으로 답변하기 어려운 경우: "일반적으로 답변 가능한 범위에서 확인해서 답변드립니다."라는 문구를 덧붙여 답변하세요. 
-                부정확한 정보나 추측은 피하고, 추가 정보가 있으면 좋을 것들을 명확하게 안내하세요.
-            4. 추가 정보 없이 답변이 어려운 개인 정보나 정신 건강 관련 질문: "이 질문은 추가 개인 정보 없이는 답변 드리기 어렵습니다. 
-            정보를 추가해서 질문해 주실 수 있을까요?"라고 답해 주세요.
-            5. 단일 질문과 다중 질문에 대한 답변 지침: 단일 질문이면 단일 질문 지침을 따르고, 다중 질문이면 다중 질문 지침을 따르세요.
-            6. 음식 또는 영양소 관련 질문: 질문에 특정 식단이나 영양 기준이 포함된 경우, 해당 기준을 바탕으로 답변하세요. 기준에 부합하지 않는 음식이라면 
-            그 이유를 설명하고, 기준에 맞는 대안을 제시해 주세요.
-
-            추가 지침 (목표나 미션 식별 시 격려 및 조언 포함):
-            - 질문에서 사용자가 달성하려는 목표나 미션(예: "16시간 단식을 해볼게요" 등)이 포함될 경우: 해당 목표를 인지하고 칭찬을 포함하여 
-            사용자에게 지속적인 동기 부여 및 조언을 제공하세요. 예: "16시간 단식을 결심하셨군요! 앞으로 지속적으로 실천하시면서 주마다 횟수를 점진적으로 
-            늘려보세요. 건강 관리를 위해 꾸준히 실천하시면 좋은 결과가 있을 거예요!"
-
-            단일 질문 지침:
-            1. 가이드가 포함된 경우, 해당 문서의 주요 정보를 먼저 제공하고 필요 시 관련된 부가 정보를 덧붙이세요.
-            2. 식품이나 영양소 관련 질문은 가이드에서 제공되는 추천 정보나 기준이 있다면 그걸 바탕으로 답변하세요.
-            3. 답변이 350자보다 짧으면 추가로 유용한 정보를 추가로 제공해 자연스럽게 확장하세요.
-            4. 하나의 질문에 대한 설명이 길거나 추가 설명이 도움이 되는 경우, 단락을 추가하여 설명하되 각각 350자 이내로 나눠서 작성하세요.
-            5. 질문에 대한 격려나 칭찬이 필요한 경우라면, 그 내용을 한 단락에 함께 제공하고 말투 지침과 금지 표현을 준수하세요.
-
-            다중 질문 지침:
-            1. 가이드가 포함된 경우, 해당 질문에 맞는 문서의 주요 정보를 참고하여 먼저 두괄식으로 제공하고 필요 시 관련된 부가 정보를 덧붙이세요.
-            2. 식품이나 영양소 관련 질문은 가이드에서 제공되는 추천 정보나 기준이 있다면 그걸 바탕으로 답변하고 일반적인 정보가 필요한 경우, 
-            해당 정보를 제공하세요.
-            3. 여러 개의 질문이 있으면 각 질문에 대한 답변을 최소 하나의 단락으로 구성하세요. 단락의 수는 질문의 수와 같아야 합니다.
-            4. 각 단락은 최대 350자를 넘지 않도록 하고, 각 질문에 대한 답변을 나눠서 작성하세요.
-            5. 하나의 질문에 추가 설명이 필요하면, 두 번째 단락으로 나누어 작성할 수 있습니다.
-
-            말투 지침:
-            1. 가이드의 말투를 참고하되, 없을 경우 전문가스럽고 친근한 말투로 답변하세요. 예시: "~이 있어요", "~하시면 좋을 것 같아요", "~을 추천드려요" 등.
-            2. 질문자가 건강에 해로울 수 있는 행동이나 과도한 요청을 할 경우, 단호하게 거절하고 횟수를 줄이거나 순서를 바꾸는 등 대안을 제시하세요. 예시: "너무 많은 양을 드시는 것은 건강에 좋지 않을 수 있어요. 오늘은 어쩔 수 없이 드시더라도, 일주일에 횟수를 줄여 나가거나 건강한 대체 식품으로 선택하시길 추천드려요."
-            3. 질문자의 건강 관리 노력이나 목표가 보일 경우, 간단한 칭찬과 격려를 한 줄 포함하세요. 예: "다이어트에 대한 노력이 정말 대단해요!"
-            4. 이모지 대신 따뜻한 인사와 감정을 담은 표현을 활용하여 답변을 부드럽게 전달하세요. (느낌표, 감탄사, 칭찬 등 활용)
-            5. 답변의 흐름이 자연스럽도록 검토하고, 부드럽게 이어질 수 있도록 구성하세요.
-
-            금지 표현:
-            1. "저칼로리," "고단백," "저지방," "저염" 등의 표현 사용을 피하세요.
-            2. "고칼로리," "저단백," "고지방," "고염" 등 영양 성분을 명사화하는 표현도 지양하세요.
-            3. "고" 또는 "저"와 같은 접두사를 사용하여 영양 성분을 명사화하는 방식을 피하세요.
-            4. 특정 영양 성분만 강조하지 말고, 균형 잡힌 정보를 제공하세요.
-            5. "전문가," "전문의," "의료진"의 상담을 권유하는 문구를 사용하지 마세요.
-            6. "가이드에 따르면 ~", "가이드" 등의 지침이나 내용을 언급하거나 비교하는 표현을 사용하지 마세요.
-        '''
-
+    def _conversation_messages(self, query, reference):
+        return CONVERSATION_PROMPT.messages(query=query, reference=reference)
 
-        # 메시지 리스트 생성
-        messages = [
-            SystemMessage(content=system_message_content),
-            HumanMessage(content=f"질문: {query}\n가이드: {reference}"),
-        ]
+    def getConversation_prompttemplate(self, query, reference):
         # OpenAI API 호출
-        response = self.llm.invoke(messages)
+        response = self.llm.invoke(self._conversation_messages(query, reference))
         return response.content
+
+    async def agetConversation_prompttemplate(self, query, reference):
+        response = await self.llm.ainvoke(self._conversation_messages(query, reference))
+        return response.content
+
+    async def astreamConversation_prompttemplate(self, query, reference):
+        async for chunk in self.llm.astream(self._conversation_messages(query, reference)):
+            if chunk.content:
+                yield chunk.content
     
+    def _summary_messages(self, query):
+        return SUMMARY_PROMPT.dict_messages(query=query)
+
     def summary(self, query):
         client = summaryai(
             api_key= os.environ['OPENAI_API_KEY'],
+            http_client=get_sync_client()
         )
         
         chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                        당신은 상담사를 지원하는 전문성을 갖춘 AI 어시스턴트입니다. 
-                        사용자의 대화를 읽고, 대화 속 궁금증, 걱정, 우려, 상황 등을 파악해 명확하게 요약하세요.
-
-                        요약 방식:
-                        - 질문이 여러 개인 경우, 유사한 질문은 묶어서 표현합니다.
-                        - 각 질문 앞에 "-" 기호를 사용하여 나열합니다.
-                        - 관련 정보는 간결히 요약하여 괄호에 포함합니다.
-                        - 질문이 명확하지 않을 경우, 이해한 내용을 최대한 반영해 작성하세요. 
-                        단, 불명확한 단어는 그대로 사용해 질문을 표시합니다. 
-                        (예: 사용자가 "!"라고 입력하면, "!에 대한 질문"으로 작성)
-                        - 물음표로 되묻거나 "질문을 이해하기 어렵습니다"와 같은 답변은 하지 않습니다.
-
-                        형식:
-                        - [질문 1] (연관된 상황이나 정보를 괄호 안에 기재)
-                        - [질문 2] (질문이 여러 개인 경우)
-                        ---
-
-                        예시 1:
-
-                        입력: "감사합니다!!\n남은 한달간 2~3인치 더 감량하는걸 목표로 잡을게요! 16시간 간헐적 단식도 할만해서 계속 유지해보긴 하겠습니다! 근데 단식이 목표 달성에 뭐가 도움이 되는걸까요?\n그리고 탄수화물을 아예 안먹다시피 하면 하루종일 음식 생각밖에 안나더라구요.. 하루에 밥 반공기, 샌드위치 반쪽 분량 정도는 섭취하려는데 괜찮을까요"
-
-                        출력:
-                        - 간헐적 단식 목표 달성 도움 여부 (한 달간 2~3인치 감량, 16시간 간헐적 단식 유지 중)
-                        - 하루 탄수화물 섭취 적정성 (밥 반공기, 샌드위치 반쪽)
-                        ---
-
-                        예시 2:
-
-                        입력: "연동은 잘 완료되었습니다!! 궁금한 점이 몇가지 있어 여쭤봅니다\n1. 혈당측정기는 물에 닿아도 괜찮을까요? 3달 내내 부착하고 있어야 하는걸까요?\n2. 혈당 측정은 자동으로 이루어지는걸까요? 아니면 따로 기록을 해야하나요?\n3. 식후 활동하기는 몇분정도 해야 적당할까요?\n오늘이 처음이라 궁금한게 너무 많네요 😅 양해 부탁드립니다.."
-
-                        출력:
-                        - 혈당측정기의 물에 대한 내구성 및 부착 기간
-                        - 혈당 측정 방식 (자동/수동 기록 필요 여부)
-                        - 식후 활동 적정 시간
-                    """,
-                },
-                {
-                    "role": "user",
-                    "content": f'''질문: {query}\n요약: ''',
-                },
-            ],
+            messages=self._summary_messages(query),
             model="gpt-4o",
         )
 
         summary = chat_completion.choices[0].message.content
         # summary = re.sub("-?\ ?요(약|지)\ ?:", "", summary).strip()
         return summary
+
+    async def asummary(self, query):
+        chat_completion = await self.summary_client.chat.completions.create(
+            messages=self._summary_messages(query),
+            model="gpt-4o",
+        )
+
+        return chat_completion.choices[0].message.content
     
     
\ No newline at end of file
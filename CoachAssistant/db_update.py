@@ -1,22 +1,39 @@
 import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+from datetime import datetime
 
 import torch
 import yaml
+import numpy as np
 import pandas as pd
 import pickle as pk
 
 from tqdm import tqdm
+from tenacity import retry, stop_after_attempt, wait_exponential
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from scipy import sparse
 from pinecone import Pinecone, ServerlessSpec
-from typing import Literal, List, Tuple
+from typing import Dict, Literal, List, Tuple
 from transformers import AutoTokenizer, AutoModel
 from sklearn.preprocessing import normalize
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from active_index import active_path, read_active
+
 with open(os.path.join(os.path.dirname(__file__), "config", 'conf.yaml')) as f:
     config = yaml.full_load(f)
 
 index_name = config["pinecone"]["index_name"]
 
+SEARCH_TEST_QUERIES = [
+    "식후 혈당 관리는 어떻게 하는게 좋을까?",
+]
+
 def tfidf_sparse_vector(query:str, vectorizer:Literal["TfidfVectorizer"]) -> Tuple[List[int], List[float]]:
     query_tfidf = vectorizer.transform([query])
 
@@ -24,52 +41,47 @@ def tfidf_sparse_vector(query:str, vectorizer:Literal["TfidfVectorizer"]) -> Tup
     values = query_tfidf.data.tolist()
     return indices, values
 
-def get_document_embedding(
-        document:str, 
+def get_document_embeddings(
+        documents:List[str],
         model:Literal["Huggingface BERT Model"],
         tok:Literal["Huggingface BERT Tokenizer"],
-        max_length=512
-    ) -> List[float]:
-    tokens = tok.encode(document, truncation=False)
-    
-    if len(tokens) <= max_length - 2:
-        chunk = [tok.cls_token_id] + tokens + [tok.sep_token_id]
-        chunk_inputs = torch.tensor([chunk])
-        
+        max_length=512,
+        batch_size=32
+    ) -> np.ndarray:
+    """
+    문서를 (max_length - 2) 토큰 단위 청크로 나눈 뒤, 길이순으로 정렬해 패딩 배치 단위로 임베딩합니다.
+    청크가 여러 개인 문서는 청크 임베딩의 평균을 L2 정규화하여 사용합니다.
+    """
+    chunks, owners = [], []
+    for doc_idx, tokens in enumerate(tok(documents, truncation=False)["input_ids"]):
+        for i in range(0, len(tokens), max_length - 2):
+            chunks.append([tok.cls_token_id] + tokens[i:i + (max_length - 2)] + [tok.sep_token_id])
+            owners.append(doc_idx)
+
+    pooled = torch.zeros(len(chunks), model.config.hidden_size)
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        width = max(len(chunks[i]) for i in batch_idx)
+
+        input_ids = torch.full((len(batch_idx), width), tok.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch_idx), width), dtype=torch.long)
+        for row, i in enumerate(batch_idx):
+            input_ids[row, :len(chunks[i])] = torch.tensor(chunks[i])
+            attention_mask[row, :len(chunks[i])] = 1
+
         with torch.no_grad():
-            outputs = model(chunk_inputs)
+            outputs = model(input_ids=input_ids, attention_mask=attention_mask)
 
-        embeddings = outputs.last_hidden_state
-        attention_mask = torch.ones(embeddings.size()[:-1])
-        mask = attention_mask.unsqueeze(-1).expand(embeddings.size()).float()
-        pooled_embedding = torch.sum(embeddings * mask, 1) / torch.clamp(mask.sum(1), min=1e-9)
+        mask = attention_mask.unsqueeze(-1).float()
+        pooled[batch_idx] = torch.sum(outputs.last_hidden_state * mask, 1) / torch.clamp(mask.sum(1), min=1e-9)
 
-        pooled_embedding = normalize(pooled_embedding, norm="l2")
+    owners = torch.tensor(owners)
+    document_embeddings = torch.zeros(len(documents), model.config.hidden_size).index_add_(0, owners, pooled)
+    document_embeddings = document_embeddings / torch.bincount(owners, minlength=len(documents)).unsqueeze(1)
 
-        return pooled_embedding.reshape(-1).tolist()
-    else:
-        chunks = [tokens[i:i + (max_length - 2)] for i in range(0, len(tokens), max_length - 2)]
-        
-        chunk_embeddings = []
-        
-        for chunk in chunks:
-            chunk = [tok.cls_token_id] + chunk + [tok.sep_token_id]
-            chunk_inputs = torch.tensor([chunk])
-            
-            with torch.no_grad():
-                outputs = model(chunk_inputs)
-        
-            chunk_embedding = outputs.last_hidden_state
-            attention_mask = torch.ones(chunk_embedding.size()[:-1])
-            mask = attention_mask.unsqueeze(-1).expand(chunk_embedding.size()).float()
-            pooled_embedding = torch.sum(chunk_embedding * mask, 1) / torch.clamp(mask.sum(1), min=1e-9)
-                
-            chunk_embeddings.append(pooled_embedding)
-        
-        document_embedding = torch.mean(torch.stack(chunk_embeddings), dim=0)
-        document_embedding = normalize(document_embedding, norm="l2")
-
-        return document_embedding.reshape(-1).tolist()    # shape: [1, 768]
+    return normalize(document_embeddings.numpy(), norm="l2").astype(np.float32)    # shape: [N, 768]
 
 def get_sentence_embedding(
         query:str,
@@ -91,7 +103,85 @@ def get_sentence_embedding(
 
     return pooled_embedding.reshape(-1).tolist()
 
-def build(index:Pinecone.Index) -> Tuple[AutoModel, AutoTokenizer, TfidfVectorizer]:
+@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, max=30), reraise=True)
+def upsert_with_retry(index:Pinecone.Index, vectors:List[dict]) -> None:
+    index.upsert(vectors=vectors)
+
+def save_local_index(
+        path:str,
+        ids:List[str],
+        dense:np.ndarray,
+        sparse_matrix:sparse.csr_matrix,
+        metadata:List[dict]
+    ) -> None:
+    """`CoachAssistant.local_index.LocalIndex`가 읽는 형식으로 인덱스 스냅샷을 저장합니다."""
+    os.makedirs(path, exist_ok=True)
+
+    # LocalIndex가 memory map으로 열 수 있도록 CSR 구성 배열을 각각 .npy로 저장
+    np.save(os.path.join(path, "dense.npy"), dense.astype(np.float32))
+    np.save(os.path.join(path, "sparse_data.npy"), sparse_matrix.data.astype(np.float32))
+    np.save(os.path.join(path, "sparse_indices.npy"), sparse_matrix.indices)
+    np.save(os.path.join(path, "sparse_indptr.npy"), sparse_matrix.indptr)
+
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "metadata": metadata, "n_features": sparse_matrix.shape[1]}, f, ensure_ascii=False, default=str)
+
+def resolve(path:str) -> str:
+    return os.path.join(os.path.dirname(__file__), path)
+
+def activate(active:dict) -> None:
+    tmp_path = f"{active_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(active, f, ensure_ascii=False)
+    os.replace(tmp_path, active_path)
+
+def cleanup(pc:Pinecone, keep:set, keep_versions:set) -> None:
+    """활성 버전과 직전 버전(롤백용)을 제외한 이전 버전의 인덱스와 스냅샷을 삭제합니다."""
+    for index in pc.list_indexes():
+        if index["name"].startswith(f"{index_name}-") and index["name"] not in keep:
+            pc.delete_index(index["name"])
+
+    for version in os.listdir(resolve(config["index"]["local_path"])):
+        path = resolve(os.path.join(config["index"]["local_path"], version))
+        if not os.path.isdir(path):
+            continue
+
+        # 중간에 실패한 실행이 남긴 임시 폴더도 함께 정리
+        if (version.isdigit() and version not in keep_versions) or version.endswith(".tmp"):
+            shutil.rmtree(path)
+
+def load_local_index(path:str) -> Tuple[List[str], np.ndarray, sparse.csr_matrix, List[dict]]:
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    dense = np.load(os.path.join(path, "dense.npy"))
+    sparse_matrix = sparse.csr_matrix(
+        (
+            np.load(os.path.join(path, "sparse_data.npy")),
+            np.load(os.path.join(path, "sparse_indices.npy")),
+            np.load(os.path.join(path, "sparse_indptr.npy"))
+        ),
+        shape=(len(meta["ids"]), meta["n_features"])
+    )
+    return meta["ids"], dense, sparse_matrix, meta["metadata"]
+
+def file_hash(path:str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def row_hashes(data:pd.DataFrame) -> Dict[str, str]:
+    """행별 (번호, 답변, 키워드, 분류) 내용 해시를 계산합니다."""
+    category_col = data.columns.tolist()[1]
+    return {
+        str(doc_id): hashlib.sha256(json.dumps([str(doc_id), content, keywords, category], ensure_ascii=False, default=str).encode()).hexdigest()
+        for doc_id, content, keywords, category in zip(data["번호"], data["답변"], data["키워드"], data[category_col])
+    }
+
+def save_manifest(path:str, pinecone_index:str, vectorizer_hash:str, rows:Dict[str, str]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"index_name": pinecone_index, "vectorizer": vectorizer_hash, "rows": rows}, f, ensure_ascii=False)
+
+def load_data() -> pd.DataFrame:
     filelist = os.listdir("data")
     if len(filelist) > 1:
         for i, fn in enumerate(filelist, start=1):
@@ -117,50 +207,177 @@ def build(index:Pinecone.Index) -> Tuple[AutoModel, AutoTokenizer, TfidfVectoriz
     data.fillna({"답변": ""}, inplace=True)
     data = data[data["답변"] != ""]
 
-    docs = data["답변"].values.tolist()
+    return data
 
+def load_embedding_model() -> Tuple[AutoModel, AutoTokenizer]:
     model_path = "jhgan/ko-sroberta-multitask"
     model = AutoModel.from_pretrained(model_path)
     tok = AutoTokenizer.from_pretrained(model_path, clean_up_tokenization_spaces=True)
+    return model, tok
+
+def get_metadata(data:pd.DataFrame) -> List[dict]:
+    category_col = data.columns.tolist()[1]
+    return [
+        {
+            "text": content,
+            "category": category,
+            "keywords": [keyword.strip() for keyword in keywords.split("#") if keyword.strip()]
+        }
+        for content, category, keywords in zip(data["답변"], data[category_col], data["키워드"])
+    ]
+
+def upsert_documents(
+        index:Pinecone.Index,
+        ids:List[str],
+        docs:List[str],
+        metadata:List[dict],
+        sparse_matrix:sparse.csr_matrix,
+        model:AutoModel,
+        tok:AutoTokenizer
+    ) -> np.ndarray:
+    build_config = config["build"]
+    upsert_batch_size = build_config["upsert_batch_size"]
+
+    dense_blocks = [np.zeros((0, model.config.hidden_size), dtype=np.float32)]
+    embed_time = 0.0
+    started = time.perf_counter()
+
+    # 임베딩이 끝난 블록은 바로 업로드 스레드로 넘기고, 그동안 다음 블록을 임베딩
+    with ThreadPoolExecutor(max_workers=build_config["upsert_workers"]) as pool, tqdm(total=len(docs), unit="doc") as pbar:
+        futures = []
+        for start in range(0, len(docs), upsert_batch_size):
+            end = min(start + upsert_batch_size, len(docs))
+
+            embed_started = time.perf_counter()
+            dense = get_document_embeddings(docs[start:end], model=model, tok=tok, batch_size=build_config["embed_batch_size"])
+            embed_time += time.perf_counter() - embed_started
+            dense_blocks.append(dense)
+
+            vectors = [
+                {
+                    "id": ids[i],
+                    "values": dense[i - start].tolist(),
+                    "sparse_values": {
+                        "indices": sparse_matrix[i].indices.tolist(),
+                        "values": sparse_matrix[i].data.tolist()
+                    },
+                    "metadata": metadata[i]
+                }
+                for i in range(start, end)
+            ]
+            futures.append(pool.submit(upsert_with_retry, index, vectors))
+            pbar.update(end - start)
+
+        for future in as_completed(futures):
+            future.result()
+
+    elapsed = time.perf_counter() - started
+    print(f"Embedding: {len(docs) / max(embed_time, 1e-9):.1f} docs/sec")
+    print(f"Total: {len(docs)} docs in {elapsed:.1f}s ({len(docs) / max(elapsed, 1e-9):.1f} docs/sec)")
+
+    return np.vstack(dense_blocks)
+
+def pretokenize(vectorizer:TfidfVectorizer, docs:List[str], workers:int) -> None:
+    """
+    TF-IDF 학습 전에 문서별 명사 추출을 여러 프로세스로 나눠 실행하고, 결과를 토크나이저 캐시에 넣습니다.
+    이후 `fit`/`transform`은 캐시된 결과를 사용하므로 형태소 분석을 다시 하지 않습니다.
+    """
+    tokenizer = vectorizer.tokenizer
+    if workers <= 1 or not hasattr(tokenizer, "batch"):
+        return
+
+    preprocess = vectorizer.build_preprocessor()
+    texts = [preprocess(vectorizer.decode(doc)) for doc in docs]
+
+    chunk_size = max(1, -(-len(texts) // (workers * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        nouns = [doc_nouns for chunk_nouns in pool.map(tokenizer.batch, chunks) for doc_nouns in chunk_nouns]
+
+    tokenizer.seed(texts, nouns)
+    print(f"Tokenized {len(texts)} docs in {time.perf_counter() - started:.1f}s ({workers} workers)")
+
+def build(index:Pinecone.Index, pinecone_index:str, snapshot_path:str) -> Tuple[AutoModel, AutoTokenizer, TfidfVectorizer]:
+    data = load_data()
+
+    docs = data["답변"].values.tolist()
 
     vectorizer = TfidfVectorizer(tokenizer="korean")
+    pretokenize(vectorizer, docs, workers=config["build"]["tokenize_workers"])
     vectorizer.fit(docs)
 
-    save_params_path = os.path.join(os.path.dirname(__file__), "config", "params", "tfidf_params.pkl")
-    pk.dump(vectorizer, open(save_params_path, "wb"))
-
-    category_col = data.columns.tolist()[1]
+    model, tok = load_embedding_model()
 
-    for idx in tqdm(range(len(data)), total=len(data)):
-        doc_id = data.iloc[idx]["번호"]
-        keywords = [keyword.strip() for keyword in data.iloc[idx]["키워드"].split("#") if keyword.strip()]
-        category = data.iloc[idx][category_col]
-        content = data.iloc[idx]["답변"]
+    tfidf_params_path = os.path.join(resolve(snapshot_path), "tfidf_params.pkl")
+    pk.dump(vectorizer, open(tfidf_params_path, "wb"))
 
-        metadata = {
-            "text": content,
-            "category": category,
-            "keywords": keywords
-        }
+    ids = [str(doc_id) for doc_id in data["번호"]]
+    metadata = get_metadata(data)
+    sparse_matrix = vectorizer.transform(docs).tocsr()
 
-        embed_docs = get_document_embedding(document=content, model=model, tok=tok)
-        sparse_vector_indices, sparse_vector_values = tfidf_sparse_vector(content, vectorizer)
-        sparse_vector = {
-            "indices": sparse_vector_indices,
-            "values": sparse_vector_values
-        }
+    dense = upsert_documents(index, ids, docs, metadata, sparse_matrix, model, tok)
 
-        index.upsert(
-            vectors=[{
-                "id": str(doc_id),
-                "values": embed_docs,
-                "sparse_values": sparse_vector,
-                "metadata": metadata
-            }]
-        )
+    save_local_index(path=resolve(snapshot_path), ids=ids, dense=dense, sparse_matrix=sparse_matrix, metadata=metadata)
+    save_manifest(os.path.join(resolve(snapshot_path), "manifest.json"), pinecone_index, file_hash(tfidf_params_path), row_hashes(data))
     
     return model, tok, vectorizer
 
+def sync(index:Pinecone.Index, active:dict, snapshot_path:str) -> Tuple[AutoModel, AutoTokenizer, TfidfVectorizer]:
+    """
+    이전 업로드 상태(manifest)와 비교하여 변경/추가된 행만 임베딩·업로드하고, 삭제된 행은 인덱스에서 제거합니다.
+    기존 TF-IDF 파라미터를 그대로 사용하므로, 어휘가 크게 바뀐 경우에는 전체 빌드(`build`)를 실행하세요.
+    서비스 중인 스냅샷은 워커들이 memory map으로 열고 있으므로 수정하지 않고, 기존 행과 변경분을 합쳐 `snapshot_path`(새 폴더)에 새로 저장합니다.
+    """
+    manifest_path = os.path.join(resolve(active["local_path"]), "manifest.json")
+    tfidf_params_path = resolve(active["tfidf_params"])
+
+    if not os.path.exists(manifest_path):
+        raise Exception("Manifest does not exist. Run a full build first.")
+
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest["index_name"] != active["pinecone_index"] or manifest["vectorizer"] != file_hash(tfidf_params_path):
+        raise Exception("Manifest does not match the current index or TF-IDF params. Run a full build first.")
+
+    data = load_data()
+    hashes = row_hashes(data)
+
+    changed = data[[hashes[str(doc_id)] != manifest["rows"].get(str(doc_id)) for doc_id in data["번호"]]]
+    removed = [doc_id for doc_id in manifest["rows"] if doc_id not in hashes]
+    print(f"Changed: {len(changed)}, Removed: {len(removed)}, Unchanged: {len(data) - len(changed)}")
+
+    model, tok = load_embedding_model()
+    vectorizer = pk.load(open(tfidf_params_path, "rb"))
+
+    changed_ids = [str(doc_id) for doc_id in changed["번호"]]
+    changed_docs = changed["답변"].values.tolist()
+    changed_metadata = get_metadata(changed)
+    changed_sparse = vectorizer.transform(changed_docs).tocsr()
+
+    changed_dense = upsert_documents(index, changed_ids, changed_docs, changed_metadata, changed_sparse, model, tok)
+
+    for start in range(0, len(removed), 1000):
+        index.delete(ids=removed[start:start + 1000])
+
+    old_ids, old_dense, old_sparse, old_metadata = load_local_index(resolve(active["local_path"]))
+    drop = set(changed_ids) | set(removed)
+    keep = [i for i, doc_id in enumerate(old_ids) if doc_id not in drop]
+
+    save_local_index(
+        path=resolve(snapshot_path),
+        ids=[old_ids[i] for i in keep] + changed_ids,
+        dense=np.vstack([old_dense[keep], changed_dense]),
+        sparse_matrix=sparse.vstack([old_sparse[keep], changed_sparse]).tocsr(),
+        metadata=[old_metadata[i] for i in keep] + changed_metadata
+    )
+    shutil.copyfile(tfidf_params_path, os.path.join(resolve(snapshot_path), "tfidf_params.pkl"))
+    save_manifest(os.path.join(resolve(snapshot_path), "manifest.json"), active["pinecone_index"], manifest["vectorizer"], hashes)
+
+    return model, tok, vectorizer
+
 def search_test(
         query: str, 
         index: Pinecone.Index, 
@@ -191,30 +408,93 @@ def search_test(
 
     return matches
 
-def run() -> None:
+def validate(
+        index:Pinecone.Index,
+        snapshot_path:str,
+        model:AutoModel,
+        tok:AutoTokenizer,
+        vectorizer:TfidfVectorizer,
+        timeout:int=300
+    ) -> None:
+    """새 인덱스에 업로드가 모두 반영되었는지 확인하고, 테스트 쿼리로 검색이 되는지 검증합니다."""
+    ids, dense, sparse_matrix, _ = load_local_index(resolve(snapshot_path))
+    if not (len(ids) == dense.shape[0] == sparse_matrix.shape[0]):
+        raise Exception(f"Local index snapshot is inconsistent: {snapshot_path}")
+
+    deadline = time.monotonic() + timeout
+    while index.describe_index_stats()["total_vector_count"] != len(ids):
+        if time.monotonic() > deadline:
+            raise Exception(f"Index did not reach {len(ids)} vectors in {timeout}s")
+        time.sleep(5)
+
+    for test_query in SEARCH_TEST_QUERIES:
+        results = search_test(test_query, index, model, tok, vectorizer)
+        print(results)
+
+        if not results:
+            raise Exception(f"Validation failed: no matches for '{test_query}'")
+
+def run(incremental:bool=False) -> None:
+    """
+    새 버전의 인덱스(Pinecone 인덱스 + 로컬 스냅샷)를 서비스 중인 인덱스와 별도로 만들고,
+    검증을 통과하면 `active.json`을 교체합니다. 각 워커는 `active.json` 변경을 감지해 재시작 없이 새 인덱스로 전환합니다.
+    """
     pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
     existing_indexes = [index["name"] for index in pc.list_indexes()]
 
-    if index_name in existing_indexes:
-        # raise Exception(f"Index {index_name} already exist!")
-        pc.delete_index(index_name)
+    active = read_active()
+    version = datetime.now().strftime("%Y%m%d%H%M%S")
+    snapshot_path = os.path.join(config["index"]["local_path"], version)
+
+    # 워커들이 memory map으로 열고 있는 .npy를 덮어쓰면 SIGBUS가 날 수 있으므로, 스냅샷은 항상 새 폴더에 쓰고 완성된 뒤 이름을 바꿔 넣습니다.
+    if snapshot_path == active["local_path"] or os.path.exists(resolve(snapshot_path)):
+        raise Exception(f"Snapshot {snapshot_path} already exists. Refusing to overwrite a live snapshot.")
+
+    staging_path = f"{snapshot_path}.tmp"
+    if os.path.exists(resolve(staging_path)):
+        shutil.rmtree(resolve(staging_path))
+    os.makedirs(resolve(staging_path))
 
-    pc.create_index(
-        name=index_name,
-        dimension=768,
-        metric="dotproduct",
-        spec=ServerlessSpec(
-            cloud="aws", region="us-east-1"
+    if incremental:
+        if active["pinecone_index"] not in existing_indexes:
+            raise Exception(f"Index {active['pinecone_index']} does not exist. Run a full build first.")
+
+        pinecone_index = active["pinecone_index"]
+        index = pc.Index(pinecone_index)
+        model, tok, vectorizer = sync(index, active, staging_path)
+    else:
+        pinecone_index = f"{index_name}-{version}"
+
+        pc.create_index(
+            name=pinecone_index,
+            dimension=768,
+            metric="dotproduct",
+            spec=ServerlessSpec(
+                cloud="aws", region="us-east-1"
+            )
         )
-    )
 
-    index = pc.Index(index_name)
+        index = pc.Index(pinecone_index)
+
+        model, tok, vectorizer = build(index, pinecone_index, staging_path)
 
-    model, tok, vectorizer = build(index)
+    os.rename(resolve(staging_path), resolve(snapshot_path))
 
-    test_query = "식후 혈당 관리는 어떻게 하는게 좋을까?"
-    results = search_test(test_query, index, model, tok, vectorizer)
-    print(results)
+    validate(index, snapshot_path, model, tok, vectorizer)
+
+    activate({
+        "version": version,
+        "pinecone_index": pinecone_index,
+        "local_path": snapshot_path,
+        "tfidf_params": os.path.join(snapshot_path, "tfidf_params.pkl")
+    })
+    print(f"Activated {version} ({pinecone_index})")
+
+    cleanup(pc, keep={pinecone_index, active["pinecone_index"]}, keep_versions={version, active["version"]})
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true", help="변경된 행만 임베딩/업로드하고 삭제된 행은 인덱스에서 제거")
+    args = parser.parse_args()
+
+    run(incremental=args.incremental)
\ No newline at end of file
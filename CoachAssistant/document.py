@@ -1,26 +1,281 @@
 import os
+import re
+import time
+import traceback
+import unicodedata
+import queue
+import threading
 import torch
 import yaml
 import pickle as pk
 
+from concurrent.futures import Future
+
 from pinecone import Pinecone
 from typing import List, Tuple
 from konlpy.tag import Mecab
-from transformers import AutoTokenizer, AutoModel
-from sklearn.preprocessing import normalize
+from transformers import AutoTokenizer
 
 from CoachAssistant.utils import query_refiner
+from CoachAssistant.active_index import active_path, read_active
+from CoachAssistant.executor import run_blocking
+from CoachAssistant.local_index import LocalIndex
+from CoachAssistant.encoder import load_encoder, PARITY_QUERIES
+from CoachAssistant.answer_cache import SemanticAnswerCache
+from utils.cache import TTLCache
+from utils.worker import ProcessLocalWorker
 
 with open(os.path.join(os.path.dirname(__file__), "config", 'conf.yaml')) as f:
     config = yaml.full_load(f)
 
-pc = Pinecone()
-index = pc.Index(config["pinecone"]["index_name"])
 
-model = AutoModel.from_pretrained(config["embedding_model"]["model_path"])
-tok = AutoTokenizer.from_pretrained(config["embedding_model"]["model_path"], clean_up_tokenization_spaces=True)
+class IndexState:
+    def __init__(self, version:str|None, index, vectorizer):
+        self.version = version
+        self.index = index
+        self.vectorizer = vectorizer
+
+
+def load_index(active:dict) -> IndexState:
+    if config["index"]["backend"] == "local":
+        index = LocalIndex.load(os.path.join(os.path.dirname(__file__), active["local_path"]))
+    else:
+        pc = Pinecone()
+        index = pc.Index(active["pinecone_index"])
+
+    vectorizer = pk.load(open(os.path.join(os.path.dirname(__file__), active["tfidf_params"]), "rb"))
+
+    return IndexState(active["version"], index, vectorizer)
+
+
+class IndexWatcher:
+    """
+    `active.json`을 최대 `reload_interval`초마다 확인하여, 새 버전이 활성화되면 인덱스와 TF-IDF 파라미터를 함께 교체합니다.
+    워커마다 파일을 직접 확인하므로 재시작 없이 모든 워커가 새 인덱스로 전환됩니다.
+    """
+    def __init__(self, reload_interval:float):
+        self.reload_interval = reload_interval
+
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._mtime = self._stat()
+        self.state = load_index(read_active())
+
+    def _stat(self) -> int | None:
+        try:
+            return os.stat(active_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _reload(self) -> None:
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return
+
+        active = read_active()
+        if active["version"] != self.state.version:
+            # Pinecone describe_index, TF-IDF unpickle, memory map 열기는 모두 이 스레드에서 끝낸 뒤 한 번에 교체
+            self.state = load_index(active)
+            query_cache.clear()
+            answer_cache.clear()
+            print(f"Index reloaded: {active['version']} ({active['pinecone_index']})")
+
+        self._mtime = mtime
+
+    def _check(self) -> None:
+        try:
+            self._reload()
+        except Exception:
+            # 새 버전을 불러오지 못하면 기존 인덱스로 계속 서비스
+            traceback.print_exc()
+        finally:
+            self._lock.release()
+
+    def current(self) -> IndexState:
+        """
+        현재 인덱스를 바로 반환합니다. 이벤트 루프에서 호출되므로 확인 주기가 지났으면 교체 작업은 백그라운드 스레드에 맡기고 기다리지 않습니다.
+        교체가 끝나기 전까지의 요청은 기존 인덱스로 처리됩니다.
+        """
+        if time.monotonic() - self._checked_at >= self.reload_interval and self._lock.acquire(blocking=False):
+            self._checked_at = time.monotonic()
+            threading.Thread(target=self._check, name="index-reload", daemon=True).start()
+
+        return self.state
+
+
+# load_resources()에서 채워짐 (CoachAssistant.resources.ResourceRegistry가 app lifespan에서 백그라운드로 호출)
+index_watcher = None
+tok = None
+model = None
+
+
+def load_resources() -> None:
+    """토크나이저, 임베딩 모델, 활성 인덱스와 TF-IDF 파라미터를 로드합니다."""
+    global index_watcher, tok, model
+
+    if model is not None:
+        return
+
+    tok = AutoTokenizer.from_pretrained(config["embedding_model"]["model_path"], clean_up_tokenization_spaces=True)
+    model = load_encoder(config["embedding_model"], tok, os.path.dirname(__file__))
+    index_watcher = IndexWatcher(reload_interval=config["index"]["reload_interval"])
+
+
+MAX_LENGTH = 512
+
+
+def length_buckets(lengths:List[int], ratio:float=config["embedding_model"]["batch"]["bucket_ratio"], min_length:int=32) -> List[List[int]]:
+    """
+    입력 인덱스를 토큰 길이 순으로 정렬해 비슷한 길이끼리 묶습니다.
+    묶음의 가장 짧은 입력보다 `ratio`배 넘게 긴 입력부터 새 묶음으로 나누며, `min_length` 이하의 짧은 입력은 모두 한 묶음에 둡니다.
+    """
+    buckets = []
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        if buckets and lengths[i] <= max(lengths[buckets[-1][0]] * ratio, min_length):
+            buckets[-1].append(i)
+        else:
+            buckets.append([i])
+    return buckets
+
+
+class _Buffers(threading.local):
+    """스레드별로 재사용하는 입력 버퍼 (배치 크기 x 시퀀스 길이만큼 앞에서부터 연속된 view로 사용)"""
+    size = 0
+
+    def get(self, batch_size:int, length:int) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        if batch_size * length > self.size:
+            self.size = max(batch_size, config["embedding_model"]["batch"]["max_batch_size"]) * MAX_LENGTH
+            self.input_ids = torch.empty(self.size, dtype=torch.long)
+            self.attention_mask = torch.empty(self.size, dtype=torch.long)
+            self.mask = torch.empty(self.size, dtype=torch.float32)
+
+        n = batch_size * length
+        return (
+            self.input_ids[:n].view(batch_size, length),
+            self.attention_mask[:n].view(batch_size, length),
+            self.mask[:n].view(batch_size, 1, length),
+        )
+
+
+_buffers = _Buffers()
+
+
+def batch_sentence_embedding(queries:List[str]) -> List[List[float]]:
+    """
+    쿼리를 토큰 길이별로 묶어(`length_buckets`) 묶음마다 필요한 길이까지만 패딩해 임베딩합니다.
+    mean pooling은 확장된 mask를 만들지 않고 `(B, 1, L) @ (B, L, H)` 배치 행렬곱 한 번으로 합산합니다.
+    """
+    encoded = tok(queries, truncation=True, max_length=MAX_LENGTH, return_attention_mask=False)["input_ids"]
+    lengths = [len(ids) for ids in encoded]
+    result = [None] * len(queries)
+
+    for bucket in length_buckets(lengths):
+        length = max(lengths[i] for i in bucket)
+        input_ids, attention_mask, mask = _buffers.get(len(bucket), length)
+
+        input_ids.fill_(tok.pad_token_id)
+        attention_mask.zero_()
+        for row, i in enumerate(bucket):
+            input_ids[row, :lengths[i]] = torch.tensor(encoded[i], dtype=torch.long)
+            attention_mask[row, :lengths[i]] = 1
+        mask.copy_(attention_mask.unsqueeze(1))
+
+        with torch.no_grad():
+            embeddings = model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            pooled = torch.bmm(mask, embeddings).squeeze(1)
+            pooled /= torch.tensor([lengths[i] for i in bucket], dtype=pooled.dtype).clamp(min=1).unsqueeze(1)
+            pooled = torch.nn.functional.normalize(pooled, dim=1)
+
+        for row, vector in zip(bucket, pooled.tolist()):
+            result[row] = vector
+
+    return result
+
+
+class EmbeddingBatcher:
+    """
+    동시에 들어온 쿼리를 최대 `max_wait_ms` 동안 모아 한 번의 forward pass로 임베딩합니다.
+    각 호출자는 자신의 쿼리에 해당하는 (mean pooling + L2 정규화된) 벡터를 돌려받습니다.
+    """
+    def __init__(self, max_batch_size:int=32, max_wait_ms:float=5):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = None
+        self._worker = ProcessLocalWorker("embedding-batcher", target=self._run, setup=self._setup)
+
+    def _setup(self) -> None:
+        self._queue = queue.Queue()
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            batch = [(q, f) for q, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                vectors = batch_sentence_embedding([q for q, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def submit(self, query:str) -> Future:
+        self._worker.ensure()
+
+        future = Future()
+        self._queue.put((query, future))
+        return future
+
+    def embed(self, query:str) -> List[float]:
+        return self.submit(query).result()
+
+
+batcher = EmbeddingBatcher(
+    max_batch_size=config["embedding_model"]["batch"]["max_batch_size"],
+    max_wait_ms=config["embedding_model"]["batch"]["max_wait_ms"]
+)
+
+# 기존 tfidf_params.pkl은 konlpy Mecab 인스턴스(Tagger 1개)를 담고 있고, MeCab parse는 스레드 안전하지 않으므로
+# 스레드 풀에서 동시에 호출되지 않도록 TF-IDF 변환을 직렬화
+tfidf_lock = threading.Lock()
 
-vectorizer = pk.load(open(os.path.join(os.path.dirname(__file__), "config", "params", "tfidf_params.pkl"), "rb"))
+query_cache = TTLCache(
+    name="coach_query",
+    max_size=config["query_cache"]["max_size"],
+    ttl=config["query_cache"]["ttl"]
+)
+
+answer_cache = SemanticAnswerCache(
+    name="coach_answer",
+    max_size=config["answer_cache"]["max_size"],
+    ttl=config["answer_cache"]["ttl"],
+    similarity=config["answer_cache"]["similarity"],
+    reference_similarity=config["answer_cache"]["reference_similarity"]
+)
+
+
+def normalize_query(query:str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", query)).strip()
 
 
 class Document_:
@@ -28,22 +283,11 @@ class Document_:
         pass
     
     def _sentence_embedding(self, query:str) -> List[float]:
-        inputs = tok(query, return_tensors="pt", padding=True, truncation=True, max_length=512)
-        
-        with torch.no_grad():
-            outputs = model(**inputs)
-        
-        embeddings = outputs.last_hidden_state
-        attention_mask = inputs["attention_mask"]
-        mask = attention_mask.unsqueeze(-1).expand(embeddings.size()).float()
-        mean_pooling_embedding = torch.sum(embeddings * mask, 1) / torch.clamp(mask.sum(1), min=1e-9)
-
-        mean_pooling_embedding = normalize(mean_pooling_embedding, norm="l2")
+        return batcher.embed(query)
 
-        return mean_pooling_embedding.reshape(-1).tolist()
-
-    def _tfidf_sparse_vector(self, query:str) -> Tuple[List[int], List[float]]:
-        query_tfidf = vectorizer.transform([query])
+    def _tfidf_sparse_vector(self, query:str, vectorizer) -> Tuple[List[int], List[float]]:
+        with tfidf_lock:
+            query_tfidf = vectorizer.transform([query])
 
         indices = query_tfidf.nonzero()[1].tolist()
         values = query_tfidf.data.tolist()
@@ -63,9 +307,20 @@ class Document_:
     def query_refine(self, query):
         return query_refiner(query)
     
-    def find_match(self, query):
-        embed_query = self._sentence_embedding(query=query)
-        sparse_vector = self._tfidf_sparse_vector(query=query)
+    def _encode_query(self, query:str, state:IndexState) -> Tuple[List[float], dict]:
+        query = normalize_query(query)
+
+        # sparse 벡터는 인덱스 버전별 TF-IDF 파라미터에 따라 달라지므로 버전을 키에 포함
+        cached = query_cache.get((state.version, query))
+        if cached is not None:
+            return cached
+
+        encoded = (self._sentence_embedding(query=query), self._tfidf_sparse_vector(query=query, vectorizer=state.vectorizer))
+        query_cache.set((state.version, query), encoded)
+        return encoded
+
+    def _query_index(self, state:IndexState, embed_query:List[float], sparse_vector:dict):
+        index = state.index
 
         if sparse_vector["indices"]:
             result = index.query(
@@ -85,6 +340,9 @@ class Document_:
 
             threshold = 0.3
 
+        return result, threshold
+
+    def _to_references(self, result, threshold:float) -> list:
         result.matches.sort(key=lambda x: x.score, reverse=True)
 
         ref_list = []
@@ -95,7 +353,7 @@ class Document_:
 
                 keywords = res["metadata"]["keywords"]
                 answer = res["metadata"]["text"]
-                image_url = res["metadata"]["url"]
+                image_url = res["metadata"].get("url")
 
                 r = [reference_id, keywords, answer, image_url]
 
@@ -105,4 +363,38 @@ class Document_:
 
             ref_list.append(r)
 
-        return ref_list
\ No newline at end of file
+        return ref_list
+
+    def find_match(self, query):
+        state = index_watcher.current()
+        embed_query, sparse_vector = self._encode_query(query, state)
+        result, threshold = self._query_index(state, embed_query, sparse_vector)
+        return self._to_references(result, threshold)
+
+    async def aquery_embedding(self, query) -> Tuple[str | None, List[float]]:
+        """현재 인덱스 버전과 쿼리 임베딩을 반환합니다. `afind_match`에서 계산한 값이 있으면 `query_cache`에서 재사용합니다."""
+        state = index_watcher.current()
+        embed_query, _ = await run_blocking("embedding", self._encode_query, query, state)
+        return state.version, embed_query
+
+    async def afind_match(self, query):
+        state = index_watcher.current()
+        embed_query, sparse_vector = await run_blocking("embedding", self._encode_query, query, state)
+        result, threshold = await run_blocking("vector_search", self._query_index, state, embed_query, sparse_vector)
+        return self._to_references(result, threshold)
+
+
+def warmup(passes:int=config["embedding_model"]["warmup_passes"]) -> None:
+    """
+    첫 요청이 지연되지 않도록 여러 길이/배치 크기로 forward pass를 미리 실행하고, 인덱스 조회 경로(Pinecone 연결, 로컬 인덱스 페이지)도 한 번 사용합니다.
+    """
+    for _ in range(passes):
+        for query in PARITY_QUERIES:
+            batch_sentence_embedding([query])
+        batch_sentence_embedding(PARITY_QUERIES)
+
+    try:
+        Document_().find_match(PARITY_QUERIES[0])
+    except Exception:
+        # 인덱스 조회 실패는 요청 처리 시 기존 예외 처리로 다룸
+        traceback.print_exc()
@@ -0,0 +1,199 @@
+import os
+import json
+import shutil
+import warnings
+
+import numpy as np
+import torch
+
+from types import SimpleNamespace
+from typing import List, Optional
+from transformers import AutoConfig, AutoModel
+
+# ONNX 변환 결과가 PyTorch와 같은 임베딩을 내는지 확인하는 고정 질의
+PARITY_QUERIES = [
+    "공복혈당 낮추는 법",
+    "식후에 바로 누워도 괜찮을까요?",
+    "16시간 간헐적 단식을 하고 있는데 아침에 커피를 마셔도 되나요?",
+    "혈당측정기는 물에 닿아도 괜찮을까요? 3달 내내 부착하고 있어야 하는걸까요?",
+    "저녁에 과일을 먹으면 살이 찌나요",
+    "운동 전후에 어떤 음식을 먹는 것이 좋을까요? 단백질 보충제도 필요한지 궁금합니다.",
+    "!",
+    "오늘 점심으로 김치찌개와 흰쌀밥 한 공기를 먹었어요. 혈당 스파이크가 왔는데 다음에는 어떻게 먹어야 할까요?",
+]
+
+
+def export_weights(model:AutoModel, path:str) -> None:
+    """
+    모델의 state_dict를 텐서별 `.npy` 파일로 저장합니다.
+    여러 워커가 동시에 내보내더라도 임시 디렉터리에 저장한 뒤 rename하므로 먼저 끝난 하나만 반영됩니다.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+
+    files = {}
+    for i, (name, tensor) in enumerate(model.state_dict().items()):
+        files[name] = f"{i:04d}.npy"
+        np.save(os.path.join(tmp_path, files[name]), tensor.detach().cpu().numpy())
+
+    with open(os.path.join(tmp_path, "weights.json"), "w") as f:
+        json.dump(files, f)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _set_tensor(model:torch.nn.Module, name:str, tensor:torch.Tensor) -> None:
+    module_name, _, attr = name.rpartition(".")
+    module = model.get_submodule(module_name) if module_name else model
+
+    if attr in module._parameters:
+        module._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+    else:
+        module._buffers[attr] = tensor
+
+
+def load_model(model_path:str, mmap_path:Optional[str]=None) -> AutoModel:
+    """
+    `mmap_path`가 주어지면 가중치를 `.npy` memory map으로 연결해 로드합니다.
+    가중치가 페이지 캐시를 통해 공유되므로 gunicorn 워커 수와 관계없이 물리 메모리에는 한 벌만 올라갑니다.
+    """
+    if mmap_path is None:
+        return AutoModel.from_pretrained(model_path).eval()
+
+    if not os.path.exists(os.path.join(mmap_path, "weights.json")):
+        export_weights(AutoModel.from_pretrained(model_path), mmap_path)
+
+    with open(os.path.join(mmap_path, "weights.json")) as f:
+        files = json.load(f)
+
+    model = AutoModel.from_config(AutoConfig.from_pretrained(model_path))
+
+    with warnings.catch_warnings():
+        # 읽기 전용 memmap을 그대로 공유하기 위함 (추론만 하므로 쓰기가 일어나지 않음)
+        warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+
+        for name, file in files.items():
+            array = np.load(os.path.join(mmap_path, file), mmap_mode="r")
+            _set_tensor(model, name, torch.from_numpy(array))
+
+    return model.eval()
+
+
+class _LastHiddenState(torch.nn.Module):
+    def __init__(self, model:AutoModel):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+def export_onnx(model:AutoModel, tok, path:str, quantize:bool=False) -> None:
+    """
+    모델을 ONNX(`last_hidden_state` 출력, batch/sequence 길이 가변)로 내보내고, `quantize`이면 동적 int8 양자화한 파일로 교체합니다.
+    임시 파일에 저장한 뒤 rename하므로 여러 워커가 동시에 내보내도 완성된 파일만 보입니다.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+
+    inputs = tok(PARITY_QUERIES[:2], return_tensors="pt", padding=True)
+    torch.onnx.export(
+        _LastHiddenState(model),
+        (inputs["input_ids"], inputs["attention_mask"]),
+        tmp_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=14,
+    )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantized_path = f"{tmp_path}.int8"
+        quantize_dynamic(tmp_path, quantized_path, weight_type=QuantType.QInt8)
+        os.replace(quantized_path, tmp_path)
+
+    os.replace(tmp_path, path)
+
+
+class OnnxEncoder:
+    """ONNX Runtime 세션을 PyTorch 모델과 같은 방식(`model(**inputs).last_hidden_state`)으로 호출할 수 있게 감쌉니다."""
+    def __init__(self, path:str, num_threads:int=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, input_ids:torch.Tensor, attention_mask:torch.Tensor, **kwargs) -> SimpleNamespace:
+        last_hidden_state, = self.session.run(["last_hidden_state"], {
+            "input_ids": input_ids.numpy().astype(np.int64),
+            "attention_mask": attention_mask.numpy().astype(np.int64),
+        })
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(last_hidden_state))
+
+
+def _embed(model, tok, queries:List[str]) -> np.ndarray:
+    inputs = tok(queries, return_tensors="pt", padding=True, truncation=True, max_length=512)
+
+    with torch.no_grad():
+        embeddings = model(**inputs).last_hidden_state
+
+    mask = inputs["attention_mask"].unsqueeze(-1).float()
+    pooled = (embeddings * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+    return torch.nn.functional.normalize(pooled, dim=-1).numpy()
+
+
+def parity(reference, candidate, tok, queries:List[str]=PARITY_QUERIES) -> float:
+    """두 모델이 만든 (mean pooling + L2 정규화) 임베딩의 질의별 코사인 유사도 중 최솟값을 반환합니다."""
+    # 패딩 길이에 따른 차이도 확인하도록 전체 배치와 질의별 단건을 모두 비교
+    batched = float(np.min(np.sum(_embed(reference, tok, queries) * _embed(candidate, tok, queries), axis=1)))
+    single = min(float(np.sum(_embed(reference, tok, [q]) * _embed(candidate, tok, [q]))) for q in queries)
+    return min(batched, single)
+
+
+def load_encoder(model_config:dict, tok, base_dir:str):
+    """
+    `embedding_model.backend` 설정에 따라 임베딩 모델을 로드합니다.
+    - `torch`: `load_model` (가중치 memory map)
+    - `onnx`: ONNX Runtime(선택적으로 int8 동적 양자화)으로 실행하며, `PARITY_QUERIES`에 대한 PyTorch 임베딩과의
+      코사인 유사도가 `onnx.parity_threshold` 미만이거나 변환/로드에 실패하면 PyTorch로 대체합니다.
+    """
+    model = load_model(
+        model_config["model_path"],
+        mmap_path=os.path.join(base_dir, model_config["mmap_path"]) if model_config.get("mmap_path") else None
+    )
+
+    if model_config.get("backend", "torch") != "onnx":
+        return model
+
+    onnx_config = model_config["onnx"]
+    path = os.path.join(base_dir, onnx_config["path"], "model.int8.onnx" if onnx_config.get("quantize") else "model.onnx")
+
+    try:
+        if not os.path.exists(path):
+            export_onnx(model, tok, path, quantize=onnx_config.get("quantize", False))
+
+        encoder = OnnxEncoder(path, num_threads=onnx_config.get("num_threads", 0))
+        similarity = parity(model, encoder, tok)
+    except Exception as e:
+        warnings.warn(f"ONNX encoder unavailable, falling back to torch: {e}")
+        return model
+
+    if similarity < onnx_config["parity_threshold"]:
+        warnings.warn(f"ONNX encoder parity check failed (min cosine {similarity:.4f} < {onnx_config['parity_threshold']}), falling back to torch")
+        return model
+
+    print(f"ONNX encoder loaded: {path} (min cosine {similarity:.4f})")
+    return encoder
@@ -0,0 +1,32 @@
+import os
+import asyncio
+import functools
+import yaml
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+with open(os.path.join(os.path.dirname(__file__), "config", 'conf.yaml')) as f:
+    config = yaml.full_load(f)
+
+# 임베딩(torch)과 Pinecone 조회처럼 블로킹되는 작업은 이벤트 루프 밖의 스레드 풀에서 실행
+executor = ThreadPoolExecutor(
+    max_workers=config["executor"]["max_workers"],
+    thread_name_prefix="coach-executor"
+)
+
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def limit(stage:str) -> asyncio.Semaphore:
+    """단계(stage)별 동시 실행 수를 제한하는 세마포어를 반환합니다 (`executor.concurrency` 참고)."""
+    if stage not in _semaphores:
+        _semaphores[stage] = asyncio.Semaphore(config["executor"]["concurrency"][stage])
+    return _semaphores[stage]
+
+
+async def run_blocking(stage:str, func:Callable, *args, **kwargs) -> Any:
+    """블로킹 함수를 스레드 풀에서 실행하고, 단계별 동시 실행 수 제한을 적용합니다."""
+    async with limit(stage):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
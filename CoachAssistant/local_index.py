@@ -0,0 +1,99 @@
+import os
+import json
+
+import numpy as np
+
+from scipy import sparse
+from typing import List, Optional
+
+
+class LocalMatch:
+    def __init__(self, id:str, score:float, metadata:Optional[dict]=None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+
+class LocalQueryResult:
+    def __init__(self, matches:List[LocalMatch]):
+        self.matches = matches
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+
+class LocalIndex:
+    """
+    `db_update.build`가 저장한 스냅샷(dense 임베딩 행렬 + TF-IDF CSR 행렬 + 메타데이터)을 메모리에 올려 검색합니다.
+    점수는 Pinecone serverless `dotproduct` 인덱스와 동일하게 dense 내적 + sparse 내적으로 계산합니다.
+    행렬은 memory map으로 열기 때문에 여러 워커가 같은 스냅샷을 읽어도 물리 메모리는 공유됩니다.
+
+    스냅샷 구성:
+        dense.npy                                         (N, 768) float32
+        sparse_data.npy, sparse_indices.npy, sparse_indptr.npy   (N, vocab) CSR 구성 배열
+        meta.json                                         {"ids": [...], "metadata": [...], "n_features": vocab}
+    """
+    def __init__(self, ids:List[str], dense:np.ndarray, sparse_matrix:sparse.csr_matrix, metadata:List[dict]):
+        self.ids = ids
+        self.dense = dense
+        self.sparse = sparse_matrix
+        self.metadata = metadata
+
+    @classmethod
+    def load(cls, path:str) -> "LocalIndex":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        dense = np.load(os.path.join(path, "dense.npy"), mmap_mode="r")
+        sparse_matrix = sparse.csr_matrix(
+            (
+                np.load(os.path.join(path, "sparse_data.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, "sparse_indices.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, "sparse_indptr.npy"), mmap_mode="r")
+            ),
+            shape=(len(meta["ids"]), meta["n_features"]),
+            copy=False
+        )
+
+        return cls(meta["ids"], dense, sparse_matrix, meta["metadata"])
+
+    def _sparse_scores(self, sparse_vector:dict) -> np.ndarray:
+        indices = np.asarray(sparse_vector["indices"], dtype=np.int64)
+        values = np.asarray(sparse_vector["values"], dtype=np.float32)
+
+        in_vocab = indices < self.sparse.shape[1]
+        indices, values = indices[in_vocab], values[in_vocab]
+
+        return np.asarray(self.sparse[:, indices] @ values).reshape(-1)
+
+    def query(
+            self,
+            vector:List[float],
+            sparse_vector:Optional[dict]=None,
+            top_k:int=10,
+            include_metadata:bool=False,
+            **kwargs
+        ) -> LocalQueryResult:
+        scores = self.dense @ np.asarray(vector, dtype=np.float32)
+
+        if sparse_vector and sparse_vector["indices"]:
+            scores = scores + self._sparse_scores(sparse_vector)
+
+        top_k = min(top_k, len(self.ids))
+        if top_k <= 0:
+            return LocalQueryResult([])
+
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        return LocalQueryResult([
+            LocalMatch(
+                id=self.ids[i],
+                score=float(scores[i]),
+                metadata=self.metadata[i] if include_metadata else None
+            )
+            for i in top
+        ])
@@ -0,0 +1,40 @@
+import asyncio
+
+from utils.log_schema import APIException, log_custom_error
+
+
+class ResourceRegistry:
+    """
+    임베딩 모델, 토크나이저, TF-IDF 파라미터, 인덱스와 `Document_`/`Chatbot_`을 app lifespan에서 로드하고 워밍업합니다.
+    uvicorn은 lifespan startup이 끝난 뒤에 요청을 받기 시작하므로, 재시작된 워커는 워밍업이 끝난 뒤에만 트래픽을 받습니다.
+    """
+    def __init__(self):
+        self.document = None
+        self.chatbot = None
+        self.ready = False
+
+    async def load(self) -> None:
+        # 로드/워밍업은 CPU 작업이므로 스레드에서 실행 (startup 동안 이벤트 루프를 막지 않도록)
+        await asyncio.to_thread(self._load_blocking)
+        self.ready = True
+
+    def _load_blocking(self) -> None:
+        from CoachAssistant import document
+        from CoachAssistant.chat import Chatbot_
+
+        self.chatbot = Chatbot_()
+        document.load_resources()
+        self.document = document.Document_()
+        document.warmup()
+
+    def require(self) -> None:
+        if not self.ready:
+            raise APIException(
+                code=503,
+                name="ServiceNotReadyException",
+                message="서비스를 준비하고 있습니다. 잠시 후에 다시 사용해주세요.",
+                traceback=log_custom_error()
+            )
+
+
+resources = ResourceRegistry()
@@ -1718,6 +1718,95 @@ class TfidfTransformer(
         }
 
 
+class _KoreanNounTokenizer:
+    """mecab-python3(mecab-ko-dic)로 명사(품사 태그가 N으로 시작)를 추출하는 토크나이저 (`tokenizer="korean"`).
+
+    - 문자열별 추출 결과를 최대 `cache_size`개까지 LRU로 보관합니다.
+    - `batch`로 여러 문서를 한 번에 처리하고, `seed`로 다른 프로세스에서 미리 추출한 결과를 캐시에 넣을 수 있습니다.
+    - pickle 시에는 사전 경로와 캐시 크기만 저장하며, MeCab Tagger는 스레드마다 처음 사용할 때 생성합니다.
+    """
+
+    def __init__(self, dicpath="/usr/local/lib/mecab/dic/mecab-ko-dic", cache_size=100000):
+        self.dicpath = dicpath
+        self.cache_size = cache_size
+        self._init_state()
+
+    def _init_state(self):
+        import threading
+        from collections import OrderedDict
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __getstate__(self):
+        return {"dicpath": self.dicpath, "cache_size": self.cache_size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def _tagger(self):
+        tagger = getattr(self._local, "tagger", None)
+        if tagger is None:
+            import MeCab
+
+            tagger = MeCab.Tagger(f"-d {self.dicpath}" if self.dicpath else "")
+            self._local.tagger = tagger
+        return tagger
+
+    def _parse(self, tagger, doc):
+        nouns = []
+        for line in tagger.parse(doc).splitlines():
+            if line == "EOS":
+                break
+            surface, _, feature = line.partition("\t")
+            if feature.startswith("N"):
+                nouns.append(surface)
+        return nouns
+
+    def _get(self, doc):
+        with self._lock:
+            nouns = self._cache.get(doc)
+            if nouns is not None:
+                self._cache.move_to_end(doc)
+            return nouns
+
+    def _put(self, doc, nouns):
+        with self._lock:
+            self._cache[doc] = nouns
+            self._cache.move_to_end(doc)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def __call__(self, doc):
+        nouns = self._get(doc)
+        if nouns is None:
+            nouns = self._parse(self._tagger(), doc)
+            self._put(doc, nouns)
+        return list(nouns)
+
+    def batch(self, docs):
+        """여러 문서의 명사를 한 번에 추출합니다. 캐시에 없는 문서만 (중복 없이) 분석합니다."""
+        tagger = None
+        results = {}
+        for doc in docs:
+            if doc in results:
+                continue
+            nouns = self._get(doc)
+            if nouns is None:
+                tagger = tagger or self._tagger()
+                nouns = self._parse(tagger, doc)
+                self._put(doc, nouns)
+            results[doc] = nouns
+        return [list(results[doc]) for doc in docs]
+
+    def seed(self, docs, nouns):
+        """미리 추출한 결과를 캐시에 넣습니다 (예: `db_update.build`의 병렬 토큰화 결과)."""
+        for doc, doc_nouns in zip(docs, nouns):
+            self._put(doc, list(doc_nouns))
+
+
 class TfidfVectorizer(CountVectorizer):
     r"""Convert a collection of raw documents to a matrix of TF-IDF features.
 
@@ -1961,10 +2050,7 @@ class TfidfVectorizer(CountVectorizer):
         sublinear_tf=False,
     ):
         if tokenizer == "korean":
-            from konlpy.tag import Mecab
-            mecab = Mecab()
-
-            tokenizer = mecab.nouns
+            tokenizer = _KoreanNounTokenizer()
         super().__init__(
             input=input,
             encoding=encoding,
@@ -1,3 +1,5 @@
 from .database import SessionLocal, DATABASE_SCHEMA, get_db
 from .models import FoodNutrition
-from .nutrition import generate_nutrition
+from .nutrition import generate_nutrition, generate_and_store, generate_and_store_shared, generate_and_store_many
+from .cache import nutrition_cache, call_count_buffer
+from .food_name import normalize_food_name, food_name_index
@@ -0,0 +1,87 @@
+import os
+import asyncio
+import datetime
+
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+
+from utils.cache import TTLCache
+from .database import SessionLocal
+from .models import FoodNutrition, kst
+
+NUTRITION_CACHE_SIZE = int(os.getenv('NUTRITION_CACHE_SIZE', 10000))
+NUTRITION_CACHE_TTL = float(os.getenv('NUTRITION_CACHE_TTL', 3600))            # seconds
+CALL_COUNT_FLUSH_INTERVAL = float(os.getenv('CALL_COUNT_FLUSH_INTERVAL', 30))  # seconds
+CALL_COUNT_FLUSH_BATCH = 500
+
+# (food_name, quantity, unit) -> FoodNutrition.json()
+nutrition_cache = TTLCache(name="food_nutrition", max_size=NUTRITION_CACHE_SIZE, ttl=NUTRITION_CACHE_TTL)
+
+class CallCountBuffer:
+    """
+    캐시 hit 시 `call_count` 증가분과 마지막 호출 시각을 메모리에 모아두었다가,
+    `CALL_COUNT_FLUSH_INTERVAL`초마다 `UPDATE ... FROM (VALUES ...)` 한 번으로 반영합니다.
+    """
+    def __init__(self):
+        self._pending: Dict[Tuple[str, float, int], list] = {}
+
+    def add(self, key:Tuple[str, float, int]) -> None:
+        timestamp = datetime.datetime.now(kst)
+        if key in self._pending:
+            self._pending[key][0] += 1
+            self._pending[key][1] = timestamp
+        else:
+            self._pending[key] = [1, timestamp]
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        items = list(pending.items())
+        committed = False
+        try:
+            async with SessionLocal() as db:
+                for start in range(0, len(items), CALL_COUNT_FLUSH_BATCH):
+                    chunk = items[start:start + CALL_COUNT_FLUSH_BATCH]
+
+                    values = ", ".join(
+                        f"(CAST(:n{i} AS VARCHAR), CAST(:q{i} AS DOUBLE PRECISION), CAST(:u{i} AS INTEGER), CAST(:c{i} AS INTEGER), CAST(:t{i} AS TIMESTAMPTZ))"
+                        for i in range(len(chunk))
+                    )
+                    params = {}
+                    for i, ((food_name, quantity, unit), (count, timestamp)) in enumerate(chunk):
+                        params.update({f"n{i}": food_name, f"q{i}": quantity, f"u{i}": unit, f"c{i}": count, f"t{i}": timestamp})
+
+                    await db.execute(
+                        text(
+                            f"UPDATE {FoodNutrition.__table__.fullname} AS f "
+                            f"SET call_count = f.call_count + v.inc, updated_at = v.ts "
+                            f"FROM (VALUES {values}) AS v(food_name, quantity, unit, inc, ts) "
+                            f"WHERE f.food_name = v.food_name AND f.quantity = v.quantity AND f.unit = v.unit"
+                        ),
+                        params
+                    )
+                await db.commit()
+                committed = True
+        except BaseException:
+            # 반영하지 못한 증가분은 다음 주기(또는 종료 시 flush)에 다시 시도. 종료 중 취소(CancelledError)된 경우도 포함
+            if committed:
+                raise
+            for key, (count, timestamp) in pending.items():
+                if key in self._pending:
+                    self._pending[key][0] += count
+                else:
+                    self._pending[key] = [count, timestamp]
+            raise
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(CALL_COUNT_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"call_count flush failed: {e}")
+
+call_count_buffer = CallCountBuffer()
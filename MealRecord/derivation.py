@@ -0,0 +1,49 @@
+import math
+
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import FoodNutrition
+
+NUTRIENT_FIELDS = ["carbohydrate", "sugar", "dietary_fiber", "protein", "fat", "starch"]
+GRAM_UNIT = 3
+
+def _scale(base: FoodNutrition, quantity: int | float, unit: int, ratio: float, serving_size: float) -> FoodNutrition:
+    return FoodNutrition(
+        food_name=base.food_name,
+        quantity=quantity,
+        unit=unit,
+        serving_size=round(serving_size, 2),
+        call_count=1,
+        derived=True,
+        **{field: round(getattr(base, field) * ratio, 2) for field in NUTRIENT_FIELDS}
+    )
+
+async def derive_nutrition(db: AsyncSession, food_name: str, unit: int, quantity: int | float) -> FoodNutrition | None:
+    """
+    같은 음식의 기존 행을 섭취량 비율로 환산해 새 행을 만듭니다. 환산할 수 있는 행이 없으면 None을 반환합니다.
+    1. 같은 단위의 행이 있으면 quantity 비율로 serving_size와 영양성분을 환산합니다.
+    2. 요청 단위가 g이면, serving_size(g)가 있는 다른 단위의 행을 g당 영양성분으로 환산합니다.
+    기준 행은 GPT가 직접 생성한 행을 우선하고, 그중 섭취량이 가장 가까운 행을 사용합니다.
+    """
+    result = await db.execute(
+        select(FoodNutrition).where(
+            FoodNutrition.food_name == food_name,
+            FoodNutrition.quantity > 0,
+            FoodNutrition.serving_size > 0
+        )
+    )
+    rows = [row for row in result.scalars().all() if all(getattr(row, field) is not None for field in NUTRIENT_FIELDS)]
+
+    same_unit = [row for row in rows if row.unit == unit]
+    if same_unit:
+        base = min(same_unit, key=lambda row: (bool(row.derived), abs(math.log(quantity / row.quantity))))
+        ratio = quantity / base.quantity
+        return _scale(base, quantity, unit, ratio, base.serving_size * ratio)
+
+    if unit == GRAM_UNIT and rows:
+        base = min(rows, key=lambda row: (bool(row.derived), abs(math.log(quantity / row.serving_size))))
+        ratio = quantity / base.serving_size
+        return _scale(base, quantity, unit, ratio, quantity)
+
+    return None
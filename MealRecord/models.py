@@ -3,7 +3,7 @@ import datetime
 
 import pytz
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, UniqueConstraint, false
 from sqlalchemy.orm import declarative_base
 
 from MealRecord import DATABASE_SCHEMA
@@ -34,6 +34,7 @@ class FoodNutrition(Base):
     fat = Column(Float)
     starch = Column(Float)
     call_count = Column(Integer, default=0)
+    derived = Column(Boolean, nullable=False, default=False, server_default=false()) # 기존 행을 섭취량 비율로 환산해 만든 행
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.datetime.now(kst))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.datetime.now(kst), onupdate=lambda: datetime.datetime.now(kst))
 
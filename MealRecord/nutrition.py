@@ -1,16 +1,30 @@
 import os
-import re
 import json
+import asyncio
 import traceback
 
-import httpx
-
 from openai import OpenAI
+from pydantic import ValidationError
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .database import SessionLocal
 from .models import FoodNutrition
+from .derivation import derive_nutrition
+from .schema import NutritionOutput, NUTRITION_RESPONSE_FORMAT
+from .singleflight import SingleFlight
 from utils import APIException, log_custom_error
+from utils.alert import send_discord_alert
+from utils.http_client import get_async_client, get_sync_client
+from utils.metrics import NUTRITION_GENERATION_FAILURES
+
+client = OpenAI(http_client=get_sync_client())
 
-client = OpenAI()
+NUTRITION_GENERATION_ATTEMPTS = 2 # 스키마 위반 시 1회 재시도
+# 일괄 요청의 동시 생성 수 (워커 전체 공유). 항목마다 GPT 호출 동안 DB 연결과 advisory lock을 잡으므로 pool_size보다 작게 유지
+NUTRITION_BULK_CONCURRENCY = int(os.getenv('NUTRITION_BULK_CONCURRENCY', 8))
 
 UNIT_MAPPING = {
     0: '인분',
@@ -24,7 +38,7 @@ SYSTEM_INSTRUCTION = """
 주어진 음식명과 섭취량을 바탕으로, 다음 단계를 순서대로 따라 섭취한 음식의 무게(g)와 영양 성분을 생성하세요:
 
 1. 음식명을 분석하여 해당 음식의 종류를 파악합니다.
-   - 주어진 데이터가 음식명이 아닐 경우, 이후 단계를 생략하고 "None"만을 반환하세요.
+   - 주어진 데이터가 음식명이 아닐 경우, is_food를 false로 하고 나머지 값은 모두 0으로 반환하세요.
 2. 음식 종류와 섭취량을 참고하여 섭취한 음식의 무게(g)를 추정합니다.
 3. 주어진 음식명과 섭취량을 바탕으로, 평균적인 영양 성분(탄수화물, 스타치, 당류, 식이섬유, 단백질, 지방)을 생성합니다.
    - 각 영양 성분은 USDA, 한국 식약처 데이터베이스 등 공인된 데이터베이스의 일반적인 수치를 참고하여 생성하세요.
@@ -32,10 +46,11 @@ SYSTEM_INSTRUCTION = """
      탄수화물(g) = 스타치(g) + 당류(g) + 식이섬유(g).
    - 1회 제공량에 대한 영양성분이 아닌, 섭취량 기준의 영양성분을 생성해야 함에 유의하세요. 
 4. 최종 결과를 아래 JSON 형식으로 출력합니다.
-   - 출력 형식 이외의 텍스트를 생성하지 않도록 유의하세요.
+   - 모든 값은 단위 없이 숫자(g)로만 출력하세요.
 
 출력 형식:
 {
+    "is_food": (음식명이 맞으면 true, 아니면 false),
     "serving_size": (섭취한 음식의 무게),
     "carbohydrate": (스타치 + 당류 + 식이섬유의 총합),
     "starch": (섭취한 음식의 스타치 총량),
@@ -46,7 +61,59 @@ SYSTEM_INSTRUCTION = """
 }
 """
 
+def raise_http_error(output) -> None:
+    """OpenAI 오류 응답을 상태 코드에 맞는 APIException으로 변환합니다 (`routers.meal_record.handle_openai_error`와 같은 분류)."""
+    status_code = output.status_code
+    try:
+        error = output.json().get("error") or {}
+    except ValueError:
+        error = {}
+    error_message = f"{status_code} {error.get('message') or output.text}"
+
+    if status_code in [401, 403, 429] or status_code >= 500:
+        send_discord_alert(error_message)
+
+    if status_code == 429:
+        raise APIException(
+            code=503,
+            name="OpenAIError.RateLimitExceeded",
+            message="현재 영양성분 분석이 불가능합니다",
+            traceback=error_message
+        )
+    if status_code >= 500:
+        raise APIException(
+            code=503,
+            name="OpenAIError.Timeout",
+            message="현재 영양성분 분석이 불가능합니다",
+            traceback=error_message
+        )
+    if status_code in [401, 403]:
+        raise APIException(
+            code=500,
+            name="OpenAIError.AuthenticationFailed",
+            message="영양 성분 계산에 실패했습니다",
+            traceback=error_message
+        )
+    if status_code == 400:
+        raise APIException(
+            code=500,
+            name="OpenAIError.InvalidRequest",
+            message="영양 성분 계산에 실패했습니다",
+            traceback=error_message
+        )
+    raise APIException(
+        code=500,
+        name="OpenAIError.UnexpectedException",
+        message="영양 성분 계산에 실패했습니다",
+        traceback=error_message
+    )
+
 async def generate_nutrition(food_name: str, unit: int, quantity: int | float) -> FoodNutrition:
+    """
+    JSON schema(strict) 형식으로 영양성분을 생성하고 `NutritionOutput`으로 검증합니다.
+    응답이 JSON이 아니거나 스키마를 벗어나면 한 번 더 생성하고, 실패 유형별 횟수는 `nutrition_generation_failures_total`로 집계합니다.
+    OpenAI가 오류 상태 코드를 반환하면 재시도하지 않고 `http_error`로 집계합니다.
+    """
     unit_text = UNIT_MAPPING[unit]
     user_input = f"음식명: {food_name}\n섭취량: {quantity} {unit_text}"
 
@@ -60,17 +127,56 @@ async def generate_nutrition(food_name: str, unit: int, quantity: int | float) -
         "messages": [
             {"role": "system", "content": SYSTEM_INSTRUCTION},
             {"role": "user", "content": user_input}
-        ]
+        ],
+        "response_format": NUTRITION_RESPONSE_FORMAT
     }
 
-    timeout = httpx.Timeout(60.0, connect=10.0, read=60.0)
-    
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        output = await client.post(url, json=payload, headers=headers)
+    for attempt in range(NUTRITION_GENERATION_ATTEMPTS):
+        output = await get_async_client().post(url, json=payload, headers=headers)
+
+        if output.status_code != 200:
+            NUTRITION_GENERATION_FAILURES.labels("http_error").inc()
+            raise_http_error(output)
+
+        choice = output.json()["choices"][0]
+        message = choice["message"]
+        response = message.get("content") or ""
+
+        if message.get("refusal"):
+            NUTRITION_GENERATION_FAILURES.labels("refusal").inc()
+            raise APIException(
+                code=510,
+                name="GenerationFailedException",
+                message="AI가 계산하기 어려운 영양성분입니다",
+                gpt_output=message["refusal"],
+                traceback=log_custom_error()
+            )
 
-    response = output.json()["choices"][0]["message"]["content"]
+        try:
+            nutrition_data = NutritionOutput.model_validate_json(response)
+            break
+        except ValidationError as e:
+            if choice.get("finish_reason") == "length":
+                kind = "truncated"
+            elif any(error["type"] == "json_invalid" for error in e.errors()):
+                kind = "invalid_json"
+            else:
+                kind = "schema_violation"
+            NUTRITION_GENERATION_FAILURES.labels(kind).inc()
 
-    if re.search(r'[Nn]one', response) or re.search(r'[Nn]ull', response):
+            if attempt + 1 < NUTRITION_GENERATION_ATTEMPTS:
+                continue
+
+            raise APIException(
+                code=500,
+                name="ResponseParsingException",
+                message="영양 성분 계산에 실패했습니다",
+                traceback=traceback.format_exc(),
+                gpt_output=response
+            )
+
+    if not nutrition_data.is_food:
+        NUTRITION_GENERATION_FAILURES.labels("not_food").inc()
         raise APIException(
             code=510,
             name="GenerationFailedException",
@@ -79,65 +185,113 @@ async def generate_nutrition(food_name: str, unit: int, quantity: int | float) -
             traceback=log_custom_error()
         )
 
-    json_match = re.search(r'{[\s\S]*?}', response)
-    if not json_match:
-        raise APIException(
-            code=500,
-            name="ResponseParsingException",
-            message="영양 성분 계산에 실패했습니다",
-            gpt_output=response,
-            traceback=log_custom_error()
-        )
-
-    try:
-        remove_annotation = re.sub(r'(//.*|#.*)', "", json_match.group())
-        nutrition_data = json.loads(remove_annotation)
-    except json.JSONDecodeError as e:
-        raise APIException(
-            code=500,
-            name="ResponseParsingException",
-            message="영양 성분 계산에 실패했습니다",
-            traceback=traceback.format_exc(),
-            gpt_output=response
-        )
-    
-    def parse_nutrient_value(value):
-        if isinstance(value, str):
-            number = re.sub(r'[^\d.]', '', value.replace(',', ''))
-            return float(number)
-        elif isinstance(value, (int, float)):
-            return value
-        return float('nan')
-    
-    serving_size = parse_nutrient_value(nutrition_data.get('serving_size'))
-    carbohydrate = parse_nutrient_value(nutrition_data.get('carbohydrate'))
-    sugar = parse_nutrient_value(nutrition_data.get('sugar'))
-    dietary_fiber = parse_nutrient_value(nutrition_data.get('dietaryFiber'))
-    protein = parse_nutrient_value(nutrition_data.get('protein'))
-    fat = parse_nutrient_value(nutrition_data.get('fat'))
-    starch = parse_nutrient_value(nutrition_data.get('starch'))
-
-    generated_data = FoodNutrition(
+    return FoodNutrition(
         food_name=food_name,
         quantity=quantity, 
         unit=unit,
-        serving_size=serving_size,
-        carbohydrate=carbohydrate,
-        sugar=sugar,
-        dietary_fiber=dietary_fiber,
-        protein=protein,
-        fat=fat,
-        starch=starch,
+        serving_size=nutrition_data.serving_size,
+        carbohydrate=nutrition_data.carbohydrate,
+        sugar=nutrition_data.sugar,
+        dietary_fiber=nutrition_data.dietary_fiber,
+        protein=nutrition_data.protein,
+        fat=nutrition_data.fat,
+        starch=nutrition_data.starch,
         call_count=1
     )
 
-    if any(map(lambda x: x is None or x < 0 or not isinstance(x, (int, float) or x in [float('inf'), float('-inf'), float('nan')]), 
-            [carbohydrate, sugar, dietary_fiber, protein, fat, starch])):
+def check_max_values(record: FoodNutrition) -> None:
+    if any(v > 999.9 for v in [record.carbohydrate, record.fat, record.protein]) or any(v > 99.9 for v in [record.sugar, record.dietary_fiber]):
         raise APIException(
             code=510,
-            name="NutritionError",
-            gpt_output=response,
-            message="AI가 계산하기 어려운 영양성분입니다",
+            name="GenerationFailedException",
+            message="영양성분의 최댓값을 초과했습니다",
+            gpt_output=json.dumps(record.json(), ensure_ascii=False),
             traceback=log_custom_error()
         )
-    return generated_data
+
+def insert_values(record: FoodNutrition) -> dict:
+    return dict(
+        food_name=record.food_name,
+        quantity=record.quantity,
+        unit=record.unit,
+        serving_size=record.serving_size,
+        carbohydrate=record.carbohydrate,
+        sugar=record.sugar,
+        dietary_fiber=record.dietary_fiber,
+        protein=record.protein,
+        fat=record.fat,
+        starch=record.starch,
+        call_count=record.call_count,
+        derived=bool(record.derived)
+    )
+
+nutrition_flight = SingleFlight()
+bulk_semaphore = asyncio.Semaphore(NUTRITION_BULK_CONCURRENCY)
+
+async def generate_and_store(db: AsyncSession, food_name: str, unit: int, quantity: int | float) -> tuple[dict, bool]:
+    """
+    영양성분을 생성해 저장하고 `(FoodNutrition.json(), 새로 생성 여부)`를 반환합니다.
+    같은 키에 대해 트랜잭션 단위 advisory lock을 잡아, 다른 워커가 먼저 생성한 경우에는 그 결과를 그대로 사용합니다.
+    같은 음식의 다른 섭취량 행이 있으면 GPT 호출 없이 비율로 환산합니다 (`derive_nutrition`).
+    """
+    lock_key = f"{food_name}|{float(quantity)}|{unit}"
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(lock_key))))
+
+    existing_record_result = await db.execute(
+        select(FoodNutrition).where(
+            FoodNutrition.food_name == food_name,
+            FoodNutrition.quantity == quantity,
+            FoodNutrition.unit == unit
+        )
+    )
+    existing_record = existing_record_result.scalar()
+
+    if existing_record:
+        await db.commit()
+        return existing_record.json(), False
+
+    new_record = await derive_nutrition(db, food_name=food_name, unit=unit, quantity=quantity)
+    if new_record is None:
+        new_record = await generate_nutrition(food_name=food_name, unit=unit, quantity=quantity)
+
+    check_max_values(new_record)
+
+    await db.execute(
+        insert(FoodNutrition)
+        .values(**insert_values(new_record))
+        .on_conflict_do_nothing(constraint="unique_food_serving")
+    )
+    await db.commit()
+
+    return new_record.json(), True
+
+async def generate_and_store_shared(food_name: str, quantity: int | float, unit: int) -> tuple[dict, bool]:
+    """
+    `nutrition_flight`로 같은 키의 동시 요청을 하나로 묶어 `generate_and_store`를 실행합니다 (단건/일괄 요청 공용).
+    실행은 요청과 분리된 task에서 이루어지므로 요청 세션 대신 별도 세션을 사용합니다.
+    새로 생성 여부는 실행을 시작한 호출에만 True로 반환하고, 결과를 공유받은 호출은 기존 데이터 조회와 같이 False를 받습니다.
+    """
+    async def generate() -> tuple[dict, bool]:
+        async with SessionLocal() as session:
+            return await generate_and_store(session, food_name=food_name, unit=unit, quantity=quantity)
+
+    (record, created), shared = await nutrition_flight.do((food_name, float(quantity), unit), generate)
+    return record, created and not shared
+
+async def generate_and_store_many(keys: list[tuple[str, int | float, int]]) -> dict:
+    """
+    여러 `(food_name, quantity, unit)`의 영양성분을 동시에 생성해 저장합니다 (식사 단위 일괄 요청용).
+    각 항목은 단건 요청과 같은 경로(`generate_and_store_shared`: `nutrition_flight` + advisory lock)를 거치므로,
+    같은 음식을 동시에 요청한 단건/일괄 요청이 있어도 GPT 호출은 한 번만 일어납니다.
+    동시에 생성하는 항목 수는 워커 전체에서 `NUTRITION_BULK_CONCURRENCY`개로 제한하여, 일괄 요청이 몰려도 단건 요청이 쓸 DB 연결을 남겨둡니다.
+    반환값은 key -> `(FoodNutrition.json(), 새로 생성 여부)` 이며, 생성에 실패한 항목은 발생한 예외를 값으로 가집니다.
+    """
+    async def generate(food_name: str, quantity: int | float, unit: int) -> tuple[dict, bool]:
+        async with bulk_semaphore:
+            return await generate_and_store_shared(food_name, quantity, unit)
+
+    results = await asyncio.gather(
+        *(generate(food_name, quantity, unit) for food_name, quantity, unit in keys),
+        return_exceptions=True
+    )
+    return dict(zip(keys, results))
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+# GPT 출력 키 (dietaryFiber만 camelCase)
+NUTRITION_OUTPUT_FIELDS = ["serving_size", "carbohydrate", "starch", "sugar", "dietaryFiber", "protein", "fat"]
+
+# OpenAI Structured Outputs(strict) 스키마: strict 모드는 모든 키가 required여야 하고 minimum 등의 제약을 지원하지 않으므로 값 범위는 NutritionOutput에서 검사
+NUTRITION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "nutrition",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "is_food": {"type": "boolean"},
+                **{field: {"type": "number"} for field in NUTRITION_OUTPUT_FIELDS}
+            },
+            "required": ["is_food", *NUTRITION_OUTPUT_FIELDS],
+            "additionalProperties": False
+        }
+    }
+}
+
+class NutritionOutput(BaseModel):
+    model_config = ConfigDict(extra="forbid", allow_inf_nan=False)
+
+    is_food: bool
+    serving_size: float = Field(ge=0)
+    carbohydrate: float = Field(ge=0)
+    starch: float = Field(ge=0)
+    sugar: float = Field(ge=0)
+    dietary_fiber: float = Field(alias="dietaryFiber", ge=0)
+    protein: float = Field(ge=0)
+    fat: float = Field(ge=0)
@@ -0,0 +1,32 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출은 먼저 시작된 하나의 실행을 기다려 그 결과(또는 예외)를 함께 받습니다.
+    프로세스 내 중복만 막으므로, 워커 간 중복은 호출하는 쪽에서 DB 락 등으로 처리해야 합니다.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def _done(self, key:Hashable, task:asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 대기자가 없을 때 "exception was never retrieved" 경고가 남지 않도록 결과를 소비
+        task.cancelled() or task.exception()
+
+    async def do(self, key:Hashable, func:Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        `(결과, shared)`를 반환합니다. `shared`는 다른 호출이 시작한 실행의 결과를 받은 경우 True입니다.
+        `func`는 호출한 요청과 분리된 task에서 실행하므로, 처음 호출한 쪽이 취소되어도 다른 대기자에게 취소가 전파되지 않습니다.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        return await asyncio.shield(task), shared
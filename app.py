@@ -1,4 +1,9 @@
+import asyncio
+
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -6,12 +11,32 @@ load_dotenv(override=True)
 
 from routers.coach_assistant import router as coach_assistant_router
 from routers.meal_record import router as meal_record_router
+from MealRecord import call_count_buffer
+from CoachAssistant.resources import resources
+from utils.http_client import get_async_client, close_clients
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_async_client()
+    # 모델/인덱스 로드와 워밍업이 끝난 뒤에 요청을 받기 시작 (재시작된 워커가 cold 상태로 트래픽을 받지 않도록)
+    await resources.load()
+    call_count_task = asyncio.create_task(call_count_buffer.run())
+
+    yield
+
+    call_count_task.cancel()
+    # 진행 중인 주기 flush가 취소되면 증가분이 버퍼로 되돌아온 뒤에 마지막 flush를 실행
+    with suppress(asyncio.CancelledError):
+        await call_count_task
+    await call_count_buffer.flush()
+    await close_clients()
 
 app = FastAPI(
     title="Coach Assistant Chatbot API",
     description="FastAPI로 구성된 Chatbot API",
     version="1.0",
-    docs_url="/docs/"
+    docs_url="/docs/",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -22,6 +47,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    if resources.ready:
+        return JSONResponse(status_code=200, content={"status": "ready"})
+    return JSONResponse(status_code=503, content={"status": "loading"})
+
 app.include_router(coach_assistant_router, prefix="/api/coach", tags=["Chatbot API"])
 app.include_router(meal_record_router, prefix="/api/gen", tags=["Generate nutritions API"])
 
@@ -1,6 +1,7 @@
 import os
 import uuid
 import json
+import asyncio
 import traceback
 
 from datetime import datetime
@@ -10,26 +11,59 @@ import openai
 import pinecone
 
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from typing import List
 
 from CoachAssistant import (
-    Document_,
-    Chatbot_,
     PineconeIndexNameError,
     PineconeUnexceptedException
 )
+from CoachAssistant.executor import limit
+from CoachAssistant.document import answer_cache
+from CoachAssistant.answer_cache import reference_key
+from CoachAssistant.resources import resources
 from utils.log_schema import LogSchema, APIException, log_custom_error
 from utils.alert import send_discord_alert, send_discord_alert_pinecone
 from utils.firebase_logger import request_log
 
 LOGGER_NAME = "coach"
 
-document = Document_()
-llm = Chatbot_()
-
 router = APIRouter()
 
+def format_reference(context:list) -> dict | None:
+    """`find_match` 결과를 Reference API 응답 형식으로 변환합니다. 관련 문서가 없으면 None을 반환합니다."""
+    if not all(list(zip(*context))[0]):
+        return None
+    
+    reference = { "reference": [] }
+    for c in context:
+        keywords_with_newline = [k + '\n' for k in c[1]] 
+        reference["reference"].append({
+            "index": c[0],
+            "keyword": keywords_with_newline,  
+            "text": c[2],
+            "image_url": c[3]
+        })
+    return reference
+
+async def cached_answer(query:str, reference_texts:list, context) -> tuple[str, bool]:
+    """
+    의미가 비슷한 질문에 같은 가이드로 생성한 답변이 있으면 재사용하고, 없으면 새로 생성해 캐시에 저장합니다.
+    `(답변, 캐시 사용 여부)`를 반환합니다.
+    """
+    version, embed_query = await resources.document.aquery_embedding(query)
+    references = reference_key(reference_texts)
+
+    answer = answer_cache.get(version, embed_query, references)
+    if answer is not None:
+        return answer, True
+
+    async with limit("llm"):
+        answer = await resources.chatbot.agetConversation_prompttemplate(query=query, reference=context)
+
+    answer_cache.set(version, embed_query, references, answer)
+    return answer, False
+
 @router.post("/summary/", response_model=dict)
 async def summarize(request:Request):
     try:
@@ -52,7 +86,8 @@ async def summarize(request:Request):
                 traceback=log_custom_error()
             )
         
-        summary = llm.summary(query)
+        async with limit("llm"):
+            summary = await resources.chatbot.asummary(query)
         response_data = {"summary": summary}
 
         try:
@@ -125,21 +160,15 @@ async def reference(request:Request):
                 traceback=log_custom_error()
             )
         
-        context = document.find_match(query)
+        resources.require()
 
-        if not all(list(zip(*context))[0]):
+        context = await resources.document.afind_match(query)
+
+        reference = format_reference(context)
+
+        if reference is None:
             _log.set_response_log(None, 204, "쿼리와 관련된 문서가 없습니다")
             return Response(status_code=204)
-        
-        reference = { "reference": [] }
-        for c in context:
-            keywords_with_newline = [k + '\n' for k in c[1]] 
-            reference["reference"].append({
-                "index": c[0],
-                "keyword": keywords_with_newline,  
-                "text": c[2],
-                "image_url": c[3]
-            })
 
         resposne_data = reference
 
@@ -241,9 +270,11 @@ async def answer(request: Request):
                 traceback=log_custom_error()
             )
         
+        resources.require()
+
         try:
             reference_list = body.get("data")[0]["reference"]
-            context = document.context_to_string(reference_list, query)
+            context = resources.document.context_to_string(reference_list, query)
         except Exception as e:
             raise APIException(
                 code=405,
@@ -255,8 +286,8 @@ async def answer(request: Request):
         if not context:
             context = ["참고문서는 없으니 너가 아는 정보로 대답해줘."]
         
-        answer = llm.getConversation_prompttemplate(query=query, reference=context)
-        response_data = {"answer": answer}
+        answer, cached = await cached_answer(query, reference_list, context)
+        response_data = {"answer": answer, "cached": cached}
         
         try:
             _log.set_response_log(response_data, status_code=200, message=None)
@@ -305,4 +336,253 @@ async def answer(request: Request):
         try:
             request_log(logger=LOGGER_NAME + ".answer", request_data=_log.get_request_log(), response_data=_log.get_reseponse_log(), error=_log.get_error_log())
         except Exception as log_exception:
-            pass
\ No newline at end of file
+            pass
+
+@router.post("/pipeline/")
+async def pipeline(request: Request):
+    """
+    요약, 답변 가이드 검색, 답변 추천을 한 번의 요청으로 처리합니다.
+    요약 생성과 (검색 → 답변 생성)을 동시에 실행하고, 검색된 가이드를 그대로 답변 생성에 사용합니다.
+    """
+    try:
+        _log = LogSchema(_id=str(uuid.uuid4()), logger=LOGGER_NAME + ".pipeline")
+
+        raw_body = await request.body()
+        body_str = raw_body.decode()
+
+        body = json.loads(body_str)
+
+        query = body.get("query")
+
+        _log.set_request_log({"query": query}, request)
+        
+        if not query.strip():
+            raise APIException(
+                code=405,
+                name="InvalidInputException",
+                message="쿼리를 입력해주세요",
+                traceback=log_custom_error()
+            )
+
+        resources.require()
+
+        async def summarize_query():
+            async with limit("llm"):
+                return await resources.chatbot.asummary(query)
+
+        async def reference_and_answer():
+            reference = format_reference(await resources.document.afind_match(query))
+
+            reference_list = [r["text"] for r in reference["reference"]] if reference else []
+            context = resources.document.context_to_string(reference_list, query)
+            if not context:
+                context = ["참고문서는 없으니 너가 아는 정보로 대답해줘."]
+
+            answer, cached = await cached_answer(query, reference_list, context)
+            return reference, answer, cached
+
+        summary, (reference, answer, cached) = await asyncio.gather(summarize_query(), reference_and_answer())
+
+        response_data = {
+            "summary": summary,
+            "reference": reference["reference"] if reference else [],
+            "answer": answer,
+            "cached": cached
+        }
+
+        try:
+            _log.set_response_log(response_data, status_code=200, message=None)
+            return JSONResponse(status_code=200, content={"status_code": 200, "data": [response_data]})
+        except:
+            raise APIException(
+                code=500,
+                name="UnexpectedError",
+                message="결과 반환 중 알 수 없는 오류가 발생했습니다",
+                gpt_output=answer,
+                traceback=traceback.format_exc()
+            )
+
+    except openai.APIError as e:
+        send_discord_alert(str(e))
+        raise APIException(
+            code=403,
+            name="OpenaiApiKeyError",
+            message="현재 AI 답변 추천이 어렵습니다. 잠시 후에 다시 사용해주세요.",
+            traceback=traceback.format_exc()
+        )
+    
+    except pinecone.exceptions.PineconeApiException as e:
+        send_discord_alert_pinecone(str(e))
+        raise APIException(
+            code=403,
+            name="PineconeApiKeyError",
+            message="현재 AI 답변 가이드 검색이 어렵습니다. 잠시 후에 다시 사용해주세요.",
+            traceback=traceback.format_exc()
+        )
+
+    except PineconeIndexNameError as e:
+        send_discord_alert_pinecone(str(e))
+        raise APIException(
+            code=403,
+            name="PineconeIndexNameError",
+            message="현재 AI 답변 가이드 검색이 어렵습니다. 잠시 후에 다시 사용해주세요.",
+            traceback=traceback.format_exc()
+        )
+    
+    except PineconeUnexceptedException as e:
+        send_discord_alert_pinecone(str(e))
+        raise APIException(
+            code=500,
+            name="PineconeUnexceptedException",
+            message="현재 AI 답변 가이드 검색이 어렵습니다. 잠시 후에 다시 사용해주세요.",
+            traceback=traceback.format_exc()
+        )
+    
+    except APIException as e:
+        e.log(_log)
+
+        raise HTTPException(
+            status_code=e.code,
+            detail={
+                "status_code": e.code,
+                "message": e.message
+            }
+        )
+    
+    except Exception as e:
+        _log.set_error_log("UnexpectedException", traceback=traceback.format_exc(), generated=None)
+        _log.set_response_log(None, 500, "알 수 없는 오류가 발생했습니다")
+
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status_code": 500,
+                "message": "알 수 없는 오류가 발생했습니다"
+            }
+        )
+
+    finally:
+        try:
+            request_log(logger=LOGGER_NAME + ".pipeline", request_data=_log.get_request_log(), response_data=_log.get_reseponse_log(), error=_log.get_error_log())
+        except Exception as log_exception:
+            pass
+
+def sse_event(data:dict, event:str|None=None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n" if event else f"data: {payload}\n\n"
+
+@router.post("/answer/stream/")
+async def answer_stream(request: Request):
+    """
+    `/answer/`와 같은 입력을 받아, 생성되는 답변을 Server-Sent Events로 전달합니다.
+    - `data: {"token": ...}`: 생성된 토큰 조각
+    - `event: done` / `data: {"answer": ...}`: 생성 완료 (전체 답변)
+    - `event: error` / `data: {"status_code": ..., "message": ...}`: 생성 중 오류
+    """
+    streaming = False
+
+    try:
+        _log = LogSchema(_id=str(uuid.uuid4()), logger=LOGGER_NAME + ".answer_stream")
+
+        raw_body = await request.body()
+        body_str = raw_body.decode()
+
+        body = json.loads(body_str)
+
+        query = body.get("query")
+        
+        _log.set_request_log({"query": query}, request)
+        
+        if not query.strip():
+            raise APIException(
+                code=405,
+                name="InvalidInputException",
+                message="쿼리를 입력해주세요",
+                traceback=log_custom_error()
+            )
+        
+        resources.require()
+
+        try:
+            reference_list = body.get("data")[0]["reference"]
+            context = resources.document.context_to_string(reference_list, query)
+        except Exception as e:
+            raise APIException(
+                code=405,
+                name="InvalidInputException",
+                message=f"잘못된 reference 입력입니다.\n{body}",
+                traceback=traceback.format_exc()
+            )
+
+        if not context:
+            context = ["참고문서는 없으니 너가 아는 정보로 대답해줘."]
+
+        async def event_stream():
+            chunks = []
+            try:
+                async with limit("llm"):
+                    async for token in resources.chatbot.astreamConversation_prompttemplate(query=query, reference=context):
+                        chunks.append(token)
+                        yield sse_event({"token": token})
+
+                answer = "".join(chunks)
+                _log.set_response_log({"answer": answer}, status_code=200, message=None)
+                yield sse_event({"answer": answer}, event="done")
+
+            except openai.APIError as e:
+                message = "현재 AI 답변 추천이 어렵습니다. 잠시 후에 다시 사용해주세요."
+                _log.set_error_log("OpenaiApiKeyError", traceback=traceback.format_exc(), generated="".join(chunks))
+                _log.set_response_log(None, 403, message)
+                yield sse_event({"status_code": 403, "message": message}, event="error")
+
+            except Exception as e:
+                _log.set_error_log("UnexpectedException", traceback=traceback.format_exc(), generated="".join(chunks))
+                _log.set_response_log(None, 500, "알 수 없는 오류가 발생했습니다")
+                yield sse_event({"status_code": 500, "message": "알 수 없는 오류가 발생했습니다"}, event="error")
+
+            finally:
+                # 클라이언트 연결이 끊겨 중단된 경우에도 그때까지 생성된 답변을 남김
+                if _log.get_reseponse_log() is None:
+                    _log.set_error_log("ClientDisconnected", traceback=None, generated="".join(chunks))
+                try:
+                    request_log(logger=LOGGER_NAME + ".answer_stream", request_data=_log.get_request_log(), response_data=_log.get_reseponse_log(), error=_log.get_error_log())
+                except Exception as log_exception:
+                    pass
+
+        streaming = True
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    except APIException as e:
+        e.log(_log)
+
+        raise HTTPException(
+            status_code=e.code,
+            detail={
+                "status_code": e.code,
+                "message": e.message
+            }
+        )
+    
+    except Exception as e:
+        _log.set_error_log("UnexpectedException", traceback=traceback.format_exc(), generated=None)
+        _log.set_response_log(None, 500, "알 수 없는 오류가 발생했습니다")
+
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "status_code": 500,
+                "message": "알 수 없는 오류가 발생했습니다"
+            }
+        )
+
+    finally:
+        # 스트리밍 응답의 로그는 생성이 끝난 뒤 event_stream에서 남김
+        if not streaming:
+            try:
+                request_log(logger=LOGGER_NAME + ".answer_stream", request_data=_log.get_request_log(), response_data=_log.get_reseponse_log(), error=_log.get_error_log())
+            except Exception as log_exception:
+                pass
@@ -12,24 +12,78 @@ import openai
 from typing import Any, Optional
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from MealRecord import (
-    generate_nutrition,
+    generate_and_store_shared,
+    generate_and_store_many,
     get_db,
-    FoodNutrition
+    FoodNutrition,
+    nutrition_cache,
+    call_count_buffer,
+    food_name_index
 )
 from utils.alert import send_discord_alert
 from utils.log_schema import LogSchema, APIException, log_custom_error
 from utils.firebase_logger import request_log
 
 API_KEY = os.environ.get("API_KEY") #API service key
+NUTRITION_BULK_MAX_ITEMS = int(os.getenv("NUTRITION_BULK_MAX_ITEMS", 20))
 
 LOGGER_NAME = "meal"
 
 router = APIRouter()
 
+def validate_item(food_name, quantity, unit):
+    if not food_name.strip():
+        raise APIException(
+            code=400,
+            name="InvalidInputException",
+            message="음식명이 없습니다",
+            traceback=log_custom_error()
+        )
+    
+    food_name_trimmed = food_name.strip()
+    special_chars_only = re.compile(r'^[!@#$%^&*()_+\-=\[\]{};\'":\\|,.<>/?]+$') # 안걸러짐 (ex: ×÷=/_[]-'; / `~\€£¥°•○●□■♤♡◇♧☆▪︎¤《》¡¿)
+
+    if special_chars_only.match(food_name_trimmed):
+        raise APIException(
+            code=400,
+            name="InvalidInputException",
+            message="올바른 음식명이 아닙니다",
+            traceback=log_custom_error()
+        )
+    if len(food_name_trimmed) > 255:
+        raise APIException(
+            code=400,
+            name="InvalidInputException",
+            message="음식명이 너무 깁니다",
+            traceback=log_custom_error()
+        )
+    if not quantity or quantity <= 0 or not isinstance(quantity, (int, float)):
+        raise APIException(
+            code=400,
+            name="InvalidInputException",
+            message="섭취량이 없습니다",
+            traceback=log_custom_error()
+        )
+    if unit is None:
+        raise APIException(
+            code=400,
+            name="InvalidInputException",
+            message="섭취량 단위가 없습니다",
+            traceback=log_custom_error()
+        )
+    if not isinstance(unit, int) or unit < 0 or unit > 4:
+        raise APIException(
+            code=400,
+            name="InvalidInputException",
+            message="올바르지 않은 섭취량 단위입니다 (0: 인분, 1: 개, 2: 접시, 3: g, 4: ml)",
+            traceback=log_custom_error()
+        )
+
 @router.post("/nutrition")
 async def nutrition(
         request: Request, 
@@ -61,85 +115,40 @@ async def nutrition(
         quantity = body.get("quantity", -1)
         unit = body.get("unit", -1)
         
-        if not food_name.strip():
-            raise APIException(
-                code=400,
-                name="InvalidInputException",
-                message="음식명이 없습니다",
-                traceback=log_custom_error()
-            )
-        
-        food_name_trimmed = food_name.strip()
-        special_chars_only = re.compile(r'^[!@#$%^&*()_+\-=\[\]{};\'":\\|,.<>/?]+$') # 안걸러짐 (ex: ×÷=/_[]-'; / `~\€£¥°•○●□■♤♡◇♧☆▪︎¤《》¡¿)
+        validate_item(food_name, quantity, unit)
 
-        if special_chars_only.match(food_name_trimmed):
-            raise APIException(
-                code=400,
-                name="InvalidInputException",
-                message="올바른 음식명이 아닙니다",
-                traceback=log_custom_error()
-            )
-        if len(food_name_trimmed) > 255:
-            raise APIException(
-                code=400,
-                name="InvalidInputException",
-                message="음식명이 너무 깁니다",
-                traceback=log_custom_error()
-            )
-        if not quantity or quantity <= 0 or not isinstance(quantity, (int, float)):
-            raise APIException(
-                code=400,
-                name="InvalidInputException",
-                message="섭취량이 없습니다",
-                traceback=log_custom_error()
-            )
-        if unit is None:
-            raise APIException(
-                code=400,
-                name="InvalidInputException",
-                message="섭취량 단위가 없습니다",
-                traceback=log_custom_error()
-            )
-        if not isinstance(unit, int) or unit < 0 or unit > 4:
-            raise APIException(
-                code=400,
-                name="InvalidInputException",
-                message="올바르지 않은 섭취량 단위입니다 (0: 인분, 1: 개, 2: 접시, 3: g, 4: ml)",
-                traceback=log_custom_error()
-            )
-        
-        response_content = {}
+        # 띄어쓰기/괄호 표기 등만 다른 기존 음식명이 있으면 그 이름으로 조회 (MealRecord.food_name.FoodNameIndex)
+        await food_name_index.refresh(db)
+        lookup_name = food_name_index.resolve(food_name)
+
+        cache_key = (lookup_name, quantity, unit)
+        cached_record = nutrition_cache.get(cache_key)
 
-        existing_record_result = await db.execute(
-            select(FoodNutrition).where(
-                FoodNutrition.food_name == food_name,
-                FoodNutrition.quantity == quantity,
-                FoodNutrition.unit == unit
+        if cached_record is None:
+            existing_record_result = await db.execute(
+                select(FoodNutrition).where(
+                    FoodNutrition.food_name == lookup_name,
+                    FoodNutrition.quantity == quantity,
+                    FoodNutrition.unit == unit
+                )
             )
-        )
-        existing_record = existing_record_result.scalar()
+            existing_record = existing_record_result.scalar()
 
-        if existing_record:
+            if existing_record:
+                cached_record = existing_record.json()
+                nutrition_cache.set(cache_key, cached_record)
+
+        if cached_record:
             response_content = {
                 'foodName': food_name,
                 'quantity': quantity,
                 'unit': unit,
-                "serving_size": existing_record.serving_size,
-                'nutrition': {
-                    'carbohydrate': existing_record.carbohydrate,
-                    'sugar': existing_record.sugar,
-                    'dietaryFiber': existing_record.dietary_fiber,
-                    'protein': existing_record.protein,
-                    'fat': existing_record.fat,
-                    'starch': existing_record.starch
-                }
+                "serving_size": cached_record["serving_size"],
+                'nutrition': cached_record["nutrition"]
             }
 
-            existing_record.call_count += 1
-            
-            timestamp = datetime.now(pytz.timezone('Asia/Seoul'))
-            existing_record.updated_at = timestamp
-            await db.commit()
+            # call_count/updated_at은 모아서 주기적으로 반영 (MealRecord.cache.CallCountBuffer)
+            call_count_buffer.add(cache_key)
             
             response_data = {key: value for key, value in response_content.items() if key != "nutrition"}
             response_data.update(response_content.get("nutrition", {}))
@@ -156,28 +165,28 @@ async def nutrition(
                     traceback=traceback.format_exc()
                 )
         
-        new_record = await generate_nutrition(food_name=food_name, unit=unit, quantity=quantity)
+        # 생성은 별도 세션에서 진행되므로 조회 트랜잭션을 먼저 끝내 요청 세션의 DB 연결을 반환
+        await db.commit()
 
-        if any(v > 999.9 for v in [new_record.carbohydrate, new_record.fat, new_record.protein]) or any(v > 99.9 for v in [new_record.sugar, new_record.dietary_fiber]):
-            raise APIException(
-                code=510,
-                name="GenerationFailedException",
-                message="영양성분의 최댓값을 초과했습니다",
-                gpt_output=json.dumps(new_record.json(), ensure_ascii=False),
-                traceback=log_custom_error()
-            )
+        # 같은 음식을 동시에 요청한 경우 하나의 생성 결과를 공유 (워커 간에는 advisory lock으로 중복 생성 방지)
+        response_content, created = await generate_and_store_shared(food_name=lookup_name, quantity=quantity, unit=unit)
+        nutrition_cache.set(cache_key, response_content)
 
-        db.add(new_record)
-        await db.commit()
+        if created:
+            food_name_index.add(lookup_name)
+        else:
+            call_count_buffer.add(cache_key)
+
+        response_content = {**response_content, 'foodName': food_name}
 
-        response_content = new_record.json()
-        
         response_data = {key: value for key, value in response_content.items() if key != "nutrition"}
         response_data.update(response_content.get("nutrition", {}))
         
+        status_code, message = (201, "Nutrition data saved to database") if created else (200, "Returning cached nutrition data")
+
         try:
-            _log.set_response_log(content=response_content, status_code=201, message="Nutrition data saved to database")
-            return JSONResponse(status_code=201, content=response_data)
+            _log.set_response_log(content=response_content, status_code=status_code, message=message)
+            return JSONResponse(status_code=status_code, content=response_data)
         except Exception as e:
             raise APIException(
                 code=500,
@@ -219,6 +228,171 @@ async def nutrition(
         except Exception as log_exception:
             pass
 
+@router.post("/nutrition/bulk")
+async def nutrition_bulk(
+        request: Request, 
+        db: AsyncSession = Depends(get_db)
+    ):
+    try:
+        _log = LogSchema(_id=str(uuid.uuid4()), logger=LOGGER_NAME + ".nutrition.bulk")
+
+        headers = dict(request.headers)
+
+        provided_api_key = headers.get("x-api-key")
+
+        raw_body = await request.body()
+        body_str = raw_body.decode()
+
+        body = json.loads(body_str)
+
+        _log.set_request_log(body, request)
+
+        if not provided_api_key or provided_api_key != API_KEY:
+            raise APIException(
+                code=400,
+                name="InvalidAPIKeyException",
+                message="API 키가 유효하지 않습니다",
+                traceback=log_custom_error()
+            )
+
+        items = body.get("items")
+
+        if not isinstance(items, list) or not items:
+            raise APIException(
+                code=400,
+                name="InvalidInputException",
+                message="음식 목록이 없습니다",
+                traceback=log_custom_error()
+            )
+        if len(items) > NUTRITION_BULK_MAX_ITEMS:
+            raise APIException(
+                code=400,
+                name="InvalidInputException",
+                message=f"한 번에 요청할 수 있는 음식은 최대 {NUTRITION_BULK_MAX_ITEMS}개입니다",
+                traceback=log_custom_error()
+            )
+
+        for item in items:
+            validate_item(item.get("foodName"), item.get("quantity", -1), item.get("unit", -1))
+
+        await food_name_index.refresh(db)
+        keys = [(food_name_index.resolve(item["foodName"]), item["quantity"], item["unit"]) for item in items]
+        unique_keys = list(dict.fromkeys(keys))
+
+        # key -> (FoodNutrition.json(), 새로 생성 여부) 또는 예외
+        results = {}
+        misses = []
+
+        for key in unique_keys:
+            cached_record = nutrition_cache.get(key)
+            if cached_record is None:
+                misses.append(key)
+            else:
+                results[key] = (cached_record, False)
+
+        if misses:
+            existing_record_result = await db.execute(
+                select(FoodNutrition).where(
+                    tuple_(FoodNutrition.food_name, FoodNutrition.quantity, FoodNutrition.unit).in_(misses)
+                )
+            )
+            for existing_record in existing_record_result.scalars().all():
+                key = (existing_record.food_name, existing_record.quantity, existing_record.unit)
+                results[key] = (existing_record.json(), False)
+                nutrition_cache.set(key, existing_record.json())
+
+            misses = [key for key in misses if key not in results]
+
+        if misses:
+            # 조회 트랜잭션을 끝내 요청 세션의 DB 연결을 생성(항목별 별도 세션)이 끝날 때까지 잡고 있지 않도록 함
+            await db.commit()
+            generated = await generate_and_store_many(misses)
+            for key, result in generated.items():
+                results[key] = result
+                if isinstance(result, BaseException):
+                    continue
+
+                nutrition_cache.set(key, result[0])
+                if result[1]:
+                    food_name_index.add(key[0])
+
+        response_items = []
+        for item, key in zip(items, keys):
+            result = results[key]
+
+            if isinstance(result, BaseException):
+                error = result if isinstance(result, APIException) else APIException(
+                    code=500,
+                    name="UnexpectedException",
+                    message="영양 성분 계산에 실패했습니다",
+                    traceback=str(result)
+                )
+                response_items.append({
+                    "foodName": item["foodName"],
+                    "quantity": item["quantity"],
+                    "unit": item["unit"],
+                    "status": error.code,
+                    "message": error.message
+                })
+                continue
+
+            record, created = result
+            if not created:
+                call_count_buffer.add(key)
+
+            response_item = {
+                "foodName": item["foodName"],
+                "quantity": item["quantity"],
+                "unit": item["unit"],
+                "serving_size": record["serving_size"],
+                "status": 201 if created else 200
+            }
+            response_item.update(record.get("nutrition", {}))
+            response_items.append(response_item)
+
+        response_data = {"items": response_items}
+
+        try:
+            _log.set_response_log(content=response_data, status_code=200, message="Returning bulk nutrition data")
+            return JSONResponse(status_code=200, content=response_data)
+        except Exception as e:
+            raise APIException(
+                code=500,
+                name="UnexpectedException",
+                message="결과 반환 중 알 수 없는 오류가 발생했습니다",
+                gpt_output=response_data,
+                traceback=traceback.format_exc()
+            )
+
+    except APIException as e:
+        e.log(_log)
+
+        raise HTTPException(
+            status_code=e.code,
+            detail={
+                "code": e.code,
+                "message": e.message
+            }
+        )
+
+    except Exception as e:
+        _log.set_error_log("UnexpectedException", traceback=traceback.format_exc(), generated=None)
+        _log.set_response_log(None, 500, "알 수 없는 오류가 발생했습니다")
+
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "code": 500,
+                "message": "알 수 없는 오류가 발생했습니다"
+            }
+        )
+
+    finally:
+        try:
+            request_log(logger=LOGGER_NAME, request_data=_log.get_request_log(), response_data=_log.get_reseponse_log(), error=_log.get_error_log())
+        except Exception as log_exception:
+            pass
+
 async def handle_openai_error(e):
     status_code = getattr(e, 'http_status', 500)
     error_type = getattr(e, 'error', {}).get('type')
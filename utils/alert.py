@@ -1,61 +1,136 @@
 import os
+import time
+import queue
 import logging
+import threading
 import requests
+
+from requests.adapters import HTTPAdapter
+
+from utils.worker import ProcessLocalWorker
 # from utils.logger import logger
 
+ALERT_DEDUP_WINDOW = float(os.getenv("ALERT_DEDUP_WINDOW", 60))     # seconds, 동일한 오류 알림을 묶는 구간
+ALERT_RATE_PER_MINUTE = float(os.getenv("ALERT_RATE_PER_MINUTE", 10))
+ALERT_BURST = int(os.getenv("ALERT_BURST", 5))
+ALERT_TIMEOUT = float(os.getenv("ALERT_TIMEOUT", 5))
+
+def _describe(error):
+    error_message = ''
+    error_status = ''
+
+    if hasattr(error, 'response') and error.response is not None:
+        error_status = getattr(error.response, 'status', '')
+        error_data = getattr(error.response, 'data', {})
+        error_message = error_data.get('error', {}).get('message', '') or str(error)
+    else:
+        error_message = str(error)
+
+    return error_status, error_message
+
+class AlertDispatcher:
+    """
+    Discord 알림을 큐에 넣고 즉시 반환하며, 백그라운드 스레드가 공유 커넥션 풀로 전송합니다.
+    - 같은 오류는 `ALERT_DEDUP_WINDOW`초 동안 한 번만 전송하고, 구간이 끝나면 중복 발생 건수를 요약해 전송합니다.
+    - 토큰 버킷(분당 `ALERT_RATE_PER_MINUTE`건, 최대 `ALERT_BURST`건)으로 전송량을 제한하며, 초과분은 건수만 모아 이후에 알립니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = ProcessLocalWorker("alert-dispatcher", target=self._run, setup=self._setup)
+
+        self._session = None
+        self._seen = {}
+        self._tokens = ALERT_BURST
+        self._refilled_at = time.monotonic()
+        self._dropped = 0
+
+    def _setup(self) -> None:
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._queue = queue.Queue()
+
+    def send(self, title:str, error) -> None:
+        webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
+
+        if not webhook_url:
+            # logger.error('Discord webhook URL is missing')
+            return
+
+        error_status, error_message = _describe(error)
+        key = (title, error_status, error_message)
+        now = time.monotonic()
+
+        self._worker.ensure()
+
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen["since"] < ALERT_DEDUP_WINDOW:
+                seen["count"] += 1
+                return
+            self._seen[key] = {"since": now, "count": 0}
+
+        content = f"🚨 {title}\n상태코드: {error_status}\n```\n{error_message}\n```"
+        self._queue.put((webhook_url, content))
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(ALERT_BURST, self._tokens + (now - self._refilled_at) * ALERT_RATE_PER_MINUTE / 60)
+        self._refilled_at = now
+
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _summarize(self) -> None:
+        """중복 구간이 끝난 오류 중 추가 발생 건이 있으면 요약 알림을 큐에 넣습니다."""
+        webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
+        now = time.monotonic()
+
+        with self._lock:
+            expired = [(key, seen) for key, seen in self._seen.items() if now - seen["since"] >= ALERT_DEDUP_WINDOW]
+            for key, _ in expired:
+                del self._seen[key]
+
+        for (title, error_status, error_message), seen in expired:
+            if seen["count"] and webhook_url:
+                content = f"🔁 {title}\n최근 {int(ALERT_DEDUP_WINDOW)}초 동안 동일한 오류 {seen['count']}건 추가 발생\n상태코드: {error_status}\n```\n{error_message}\n```"
+                self._queue.put((webhook_url, content))
+
+    def _post(self, webhook_url:str, content:str) -> None:
+        if not self._take_token():
+            self._dropped += 1
+            return
+
+        if self._dropped:
+            content = f"{content}\n(전송 한도 초과로 생략된 알림 {self._dropped}건)"
+            self._dropped = 0
+
+        try:
+            # logger.info('Sending Discord alert', extra={'content': content})
+            response = self._session.post(webhook_url, json={'content': content}, timeout=ALERT_TIMEOUT)
+            response.raise_for_status()
+            # logger.info('Discord alert sent successfully')
+        except Exception as err:
+            # logger.error('Discord alert failed', extra={
+            #     'error': str(err),
+            #     'originalError': str(error)
+            # })
+            print(err)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._post(*self._queue.get(timeout=1))
+            except queue.Empty:
+                pass
+            self._summarize()
+
+alert_dispatcher = AlertDispatcher()
+
 def send_discord_alert(error):
-    webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
-    print('Webhook URL:', 'exists' if webhook_url else 'missing')
-    
-    if not webhook_url:
-        # logger.error('Discord webhook URL is missing')
-        return
-
-    try:
-        error_message = ''
-        error_status = ''
-        
-        if hasattr(error, 'response') and error.response is not None:
-            error_status = getattr(error.response, 'status', '')
-            error_data = getattr(error.response, 'data', {})
-            error_message = error_data.get('error', {}).get('message', '') or str(error)
-        else:
-            error_message = str(error)
-        
-        content = f"🚨 OpenAI API 오류 발생\n상태코드: {error_status}\n```\n{error_message}\n```"
-        
-        # logger.info('Sending Discord alert', extra={'content': content})
-        response = requests.post(webhook_url, json={'content': content})
-        response.raise_for_status()
-        # logger.info('Discord alert sent successfully')
-    except Exception as err:
-        # logger.error('Discord alert failed', extra={
-        #     'error': str(err),
-        #     'originalError': str(error)
-        # })
-        print(err)
+    alert_dispatcher.send("OpenAI API 오류 발생", error)
 
 def send_discord_alert_pinecone(error):
-    webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
-    print('Webhook URL:', 'exists' if webhook_url else 'missing')
-    
-    if not webhook_url:
-        return
-
-    try:
-        error_message = ''
-        error_status = ''
-        
-        if hasattr(error, 'response') and error.response is not None:
-            error_status = getattr(error.response, 'status', '')
-            error_data = getattr(error.response, 'data', {})
-            error_message = error_data.get('error', {}).get('message', '') or str(error)
-        else:
-            error_message = str(error)
-        
-        content = f"🚨 pinecone 오류 발생\n상태코드: {error_status}\n```\n{error_message}\n```"
-        
-        response = requests.post(webhook_url, json={'content': content})
-        response.raise_for_status()
-    except Exception as err:
-        print(err)
\ No newline at end of file
+    alert_dispatcher.send("pinecone 오류 발생", error)
@@ -0,0 +1,56 @@
+import time
+import threading
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from utils.metrics import CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    최대 `max_size`개의 항목을 유지하는 LRU 캐시입니다. 각 항목은 `ttl`초가 지나면 만료됩니다.
+    hit/miss/eviction 횟수는 `cache` 라벨(`name`)로 Prometheus 카운터에 기록됩니다.
+    """
+    def __init__(self, name:str, max_size:int=1024, ttl:float=3600):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key:Hashable, default:Any=None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+
+            if item is not _MISSING and item[0] < time.monotonic():
+                del self._data[key]
+                CACHE_EVICTIONS.labels(self.name).inc()
+                item = _MISSING
+
+            if item is _MISSING:
+                CACHE_MISSES.labels(self.name).inc()
+                return default
+
+            self._data.move_to_end(key)
+            CACHE_HITS.labels(self.name).inc()
+            return item[1]
+
+    def set(self, key:Hashable, value:Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                CACHE_EVICTIONS.labels(self.name).inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,11 +1,107 @@
 from utils.firebase import db
 from utils.alert import send_discord_alert
+from utils.worker import ProcessLocalWorker
+import os
+import json
+import time
 import uuid
+import queue
+import atexit
+import threading
 
 import pytz
 from datetime import datetime
 seoul_tz = pytz.timezone('Asia/Seoul')
 
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 200))                 # Firestore batch write 최대 500건
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 2.0))       # seconds
+LOG_COMMIT_TIMEOUT = float(os.getenv("LOG_COMMIT_TIMEOUT", 10.0))      # seconds
+LOG_SPILL_DIR = os.path.join(os.path.dirname(__file__), "utils_logs")
+
+class LogShipper:
+    """
+    요청 로그를 메모리 큐에 넣고 즉시 반환하며, 백그라운드 스레드가 `LOG_BATCH_SIZE`건 또는 `LOG_FLUSH_INTERVAL`초마다
+    Firestore batch write로 저장합니다. 큐가 가득 찼거나 Firestore 저장이 실패/지연되면 `utils/utils_logs`에 JSON Lines로 기록합니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = ProcessLocalWorker("log-shipper", target=self._run, setup=self._setup)
+
+    def _setup(self) -> None:
+        self._queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    def put(self, logging_data:dict) -> None:
+        self._worker.ensure()
+
+        try:
+            self._queue.put_nowait(logging_data)
+        except queue.Full:
+            self._spill([logging_data])
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+
+        while len(batch) < LOG_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._flush(self._collect())
+
+    def _flush(self, batch:list) -> None:
+        try:
+            write_batch = db.batch()
+            for logging_data in batch:
+                write_batch.set(db.collection('logs').document(logging_data["document_id"]), logging_data)
+            write_batch.commit(timeout=LOG_COMMIT_TIMEOUT)
+        except Exception as e:
+            self._spill(batch)
+            send_discord_alert(f'Firebase logging failed:, {str(e)}')
+
+    def _spill(self, batch:list) -> None:
+        try:
+            os.makedirs(LOG_SPILL_DIR, exist_ok=True)
+            file_name = f"firestore_spill_{datetime.now(seoul_tz).strftime('%Y%m%d')}.jsonl"
+
+            with self._lock, open(os.path.join(LOG_SPILL_DIR, file_name), "a", encoding="utf-8") as f:
+                for logging_data in batch:
+                    f.write(json.dumps(logging_data, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            print(e)
+
+    def drain(self) -> None:
+        """프로세스 종료 시 큐에 남은 로그를 저장합니다."""
+        if not self._worker.started_here():
+            return
+
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+            if len(batch) >= LOG_BATCH_SIZE:
+                self._flush(batch)
+                batch = []
+
+        if batch:
+            self._flush(batch)
+
+log_shipper = LogShipper()
+atexit.register(log_shipper.drain)
+
 def request_log(logger, request_data, response_data, error=None):
     current_time = datetime.now(seoul_tz)
     try:
@@ -21,6 +117,6 @@ def request_log(logger, request_data, response_data, error=None):
                 "traceback": None
             }
         }
-        db.collection('logs').add(logging_data)
+        log_shipper.put(logging_data)
     except Exception as e:
-        send_discord_alert(f'Firebase logging failed:, {str(e)}')
\ No newline at end of file
+        send_discord_alert(f'Firebase logging failed:, {str(e)}')
@@ -0,0 +1,12 @@
+from prometheus_client import Counter, Gauge
+
+# prometheus_fastapi_instrumentator가 노출하는 기본 레지스트리(/metrics)에 함께 등록됨
+CACHE_HITS = Counter("cache_hits_total", "Number of cache hits", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Number of cache misses", ["cache"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Number of entries evicted by size or TTL", ["cache"])
+NUTRITION_GENERATION_FAILURES = Counter(
+    "nutrition_generation_failures_total",
+    "Number of failed nutrition generation responses by failure kind (http_error, refusal, truncated, invalid_json, schema_violation, not_food)",
+    ["kind"]
+)
+PROMPT_TOKENS = Gauge("prompt_template_tokens", "Number of tokens in the static system prompt of each prompt template version", ["prompt", "version"])
@@ -0,0 +1,41 @@
+import os
+import threading
+
+from typing import Callable, Optional
+
+
+class ProcessLocalWorker:
+    """
+    프로세스마다 하나의 백그라운드 데몬 스레드를 처음 필요할 때 띄웁니다.
+    fork 이후(gunicorn worker)에는 부모 프로세스의 스레드가 없으므로, pid가 바뀌었거나 스레드가 종료되었으면 `setup` 후 새로 띄웁니다.
+    `setup`에서는 큐/세션 등 스레드와 함께 프로세스별로 만들어야 하는 자원을 초기화합니다.
+    """
+    def __init__(self, name:str, target:Callable[[], None], setup:Optional[Callable[[], None]]=None):
+        self.name = name
+        self.target = target
+        self.setup = setup
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _running(self) -> bool:
+        return self._pid == os.getpid() and self._thread.is_alive()
+
+    def ensure(self) -> None:
+        if self._running():
+            return
+
+        with self._lock:
+            if self._running():
+                return
+
+            if self.setup is not None:
+                self.setup()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def started_here(self) -> bool:
+        """현재 프로세스에서 스레드를 띄운 적이 있는지 여부"""
+        return self._pid == os.getpid()